@@ -0,0 +1,180 @@
+# MangaToolkitV4 (c) 2025 S1riuSS3301
+# Licensed under end-user license agreement (EULA). See LICENSE for details.
+# Use permitted only in original, unmodified form for personal/internal, non-commercial purposes.
+import mmap
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlparse
+
+# Идентификатор главы: A-B(.C...), A — том (major), B(.C) — глава с подглавами.
+# Ссылки вида /manga/<slug>/chapter/<id>; хвост вроде ".html" в id не попадает.
+_ID = r"\d+-\d+(?:\.\d+)*"
+CHAPTER_LINK_RE = re.compile(r"/manga/([\w\-]+)/chapter/(" + _ID + r")")
+CHAPTER_LINK_RE_B = re.compile(rb"/manga/([\w\-]+)/chapter/(" + _ID.encode() + rb")")
+CHAPTER_ID_RE = re.compile(r"^(\d+)-(\d+(?:\.\d+)*)$")
+
+# Компактный сортируемый вид: (major, (minor, sub, ...)) — сравнивается как кортеж
+ChapterKey = Tuple[int, Tuple[int, ...]]
+
+_UNPARSED: ChapterKey = (1 << 30, (99999,))
+
+
+def parse_id(cid: str) -> Optional[ChapterKey]:
+    """'15-16.5' -> (15, (16, 5)); None, если это не id главы."""
+    m = CHAPTER_ID_RE.match(cid)
+    if not m:
+        return None
+    return int(m.group(1)), tuple(int(x) for x in m.group(2).split('.'))
+
+
+def sort_key(cid: str) -> ChapterKey:
+    # нераспознанные id — в конец
+    return parse_id(cid) or _UNPARSED
+
+
+def chapter_id_from_url(url: str) -> Optional[str]:
+    """Сегмент после /chapter/ в пути URL (или None)."""
+    parts = [x for x in urlparse(url).path.split('/') if x]
+    try:
+        return parts[parts.index('chapter') + 1]
+    except (ValueError, IndexError):
+        return None
+
+
+def sorted_ids(ids: Iterable[str]) -> List[str]:
+    return sorted(set(ids), key=sort_key)
+
+
+def iter_links(html: str) -> Iterator[Tuple[str, str]]:
+    """(slug, id) для каждого вхождения /manga/<slug>/chapter/<id> в тексте."""
+    for m in CHAPTER_LINK_RE.finditer(html):
+        yield m.group(1), m.group(2)
+
+
+def _collect(pairs: Iterable[Tuple[str, str]], slug: Optional[str]) -> Tuple[Optional[str], Set[str]]:
+    ids: Set[str] = set()
+    for sl, cid in pairs:
+        if slug is None:
+            slug = sl
+        if sl == slug:
+            ids.add(cid)
+    return slug, ids
+
+
+def parse_ids(html: str, slug: Optional[str] = None) -> Tuple[Optional[str], List[str]]:
+    """Все id глав тайтла slug из HTML (если slug не задан — первого встреченного)."""
+    slug, ids = _collect(iter_links(html), slug)
+    return slug, sorted_ids(ids)
+
+
+def iter_file_links(path: str) -> Iterator[Tuple[str, str]]:
+    """iter_links для сохранённого HTML на диске: файл отображается через mmap
+    и сканируется bytes-регуляркой, декодируются только совпадения — дамп
+    в сотни МБ не превращается в одну огромную str.
+    """
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # пустой файл
+            return
+        try:
+            for m in CHAPTER_LINK_RE_B.finditer(mm):
+                yield m.group(1).decode('ascii', 'ignore'), m.group(2).decode('ascii')
+        finally:
+            mm.close()
+
+
+def scan_file(path: str, slug: Optional[str] = None) -> Tuple[Optional[str], List[str]]:
+    """parse_ids по файлу через iter_file_links."""
+    slug, ids = _collect(iter_file_links(path), slug)
+    return slug, sorted_ids(ids)
+
+
+def group_by_major(ids: Iterable[str]) -> Dict[int, List[str]]:
+    """{major: [minor, ...]} за один проход; тома и главы внутри — по порядку."""
+    groups: Dict[int, List[Tuple[Tuple[int, ...], str]]] = {}
+    for cid in ids:
+        key = parse_id(cid)
+        if key is None:
+            continue
+        groups.setdefault(key[0], []).append((key[1], cid.split('-', 1)[1]))
+    return {major: [minor for _, minor in sorted(v)] for major, v in sorted(groups.items())}
+
+
+# Сколько байт конца куска держать для регулярки: ссылка может оказаться
+# разрезанной между кусками потока.
+_STREAM_TAIL = 512
+
+
+class ChapterListParser:
+    """Инкрементальный разбор страницы списка глав (?tab=chapters).
+
+    Куски ответа подаются в feed() по мере прихода: lxml HTMLPullParser
+    отдаёт закрытые <a> (элементы сразу очищаются, дерево не копится),
+    а bytes-регулярка ищет ссылки вида /manga/<slug>/chapter/<id> в том же
+    куске (на случай скрытых/ленивых блоков). Найденная впервые глава сразу
+    передаётся в on_found(cid, url); close() возвращает итоговый
+    упорядоченный список URL без дублей.
+    """
+
+    def __init__(self, base_url: str, slug: Optional[str] = None,
+                 on_found: Optional[Callable[[str, str], None]] = None):
+        from lxml import etree
+        self.base_url = base_url
+        self.slug = slug
+        self.on_found = on_found
+        self.found: Dict[str, str] = {}   # cid -> url
+        self._parser = etree.HTMLPullParser(events=('end',), tag='a')
+        self._tail = b''
+
+    def _add(self, cid: str, url: str, canonical: bool = False) -> None:
+        if cid not in self.found:
+            self.found[cid] = url
+            if self.on_found is not None:
+                self.on_found(cid, url)
+        elif canonical:
+            # как и раньше: ссылка из регулярки приоритетнее href с хвостами
+            self.found[cid] = url
+
+    def _read_anchors(self) -> None:
+        for _, el in self._parser.read_events():
+            href = el.get('href')
+            el.clear()
+            if not href or '/chapter/' not in href:
+                continue
+            full = href if href.startswith('http') else urljoin(self.base_url, href)
+            if self.slug and f"/manga/{self.slug}/chapter/" not in full:
+                continue
+            cid = chapter_id_from_url(full)
+            if cid:
+                self._add(cid, full)
+
+    def _scan(self, buf: bytes, final: bool) -> None:
+        # совпадение у самого конца может быть неполным ("1-2." + "5" в следующем куске)
+        limit = len(buf) if final else len(buf) - 2
+        last = 0
+        for m in CHAPTER_LINK_RE_B.finditer(buf):
+            if m.end() > limit:
+                break
+            sl, cid = m.group(1).decode('ascii', 'ignore'), m.group(2).decode('ascii')
+            last = m.end()
+            if self.slug and sl != self.slug:
+                continue
+            self._add(cid, urljoin(self.base_url, f"/manga/{sl}/chapter/{cid}"), canonical=True)
+        self._tail = b'' if final else buf[max(last, len(buf) - _STREAM_TAIL):]
+
+    def feed(self, chunk: bytes) -> None:
+        self._parser.feed(chunk)
+        self._read_anchors()
+        self._scan(self._tail + chunk, final=False)
+
+    def close(self) -> List[str]:
+        try:
+            self._parser.close()
+        except Exception:
+            # битый/пустой HTML — ссылки из регулярки всё равно есть
+            pass
+        self._read_anchors()
+        self._scan(self._tail, final=True)
+        return [self.found[cid] for cid in sorted(self.found, key=sort_key)]
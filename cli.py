@@ -5,13 +5,15 @@ import argparse
 import logging
 import os
 import re
+import sys
 from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup
 
+import chapter_ids
+import profiling
 from logging_setup import setup_logging
-from session_manager import SessionManager
-from extractor import extract_image_urls
-from downloader import download_images
+
+# requests/bs4/lxml/yaml и модули скачивания импортируются лениво (в main и
+# по месту использования), чтобы --help и --dry-run запускались быстро.
 
 
 def _pad2(n: int) -> str:
@@ -47,6 +49,7 @@ def extract_meta(html: str, chapter_url: str):
     tom_num = None
     glava_num = None
     try:
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html, 'lxml')
         title = soup.title.text if soup.title else ''
         m_t = re.search(r'Том\s*(\d+)', title, re.IGNORECASE)
@@ -62,7 +65,7 @@ def extract_meta(html: str, chapter_url: str):
     # Сопоставим с идентификатором из URL, чтобы учесть десятичные подглавы
     url_major = None
     url_minor = None
-    m_url = re.match(r'^(\d+)-([0-9][0-9\.]*)$', chapter_id)
+    m_url = chapter_ids.CHAPTER_ID_RE.match(chapter_id)
     if m_url:
         url_major = int(m_url.group(1))
         url_minor = m_url.group(2)  # строкой, чтобы сохранить десятичные точки
@@ -106,7 +109,18 @@ def build_arg_parser():
     p.add_argument('--dry-run', action='store_true', help='Только вывести список URL страниц без скачивания')
     p.add_argument('--auto-next', type=int, default=0, help='Скачать также N следующих глав, инкрементируя вторую часть идентификатора A-B')
     p.add_argument('--all', action='store_true', help='Скачать все главы манги, начиная с самой первой до последней')
-    p.add_argument('-f', '--force', action='store_true', help='Принудительно перекачивать главы (файлы будут перезаписаны, если это поддерживается)')
+    p.add_argument('-f', '--force', action='store_true', help='Перепроверить уже скачанные страницы условными запросами (ETag/Last-Modified) и перекачать изменившиеся')
+    p.add_argument('--watch', metavar='FILE', help='Режим наблюдения: файл со списком slug (по одному в строке); качаются только новые главы')
+    p.add_argument('--watch-once', action='store_true', help='С --watch: выполнить один цикл опроса и выйти (для cron)')
+    p.add_argument('--profile', action='store_true', help='Профилирование: cProfile, tracemalloc по главам и время по стадиям в logs/run-*.profile/')
+    p.add_argument('--log-json', action='store_true', help='Писать файл лога в формате JSON Lines')
+    p.add_argument('--slug-list', metavar='FILE', help='Файл со списком slug (по одному в строке) вместо одного --slug')
+    p.add_argument('--plan', metavar='MANIFEST', help='Только обойти главы и записать JSONL-манифест страниц (без скачивания)')
+    p.add_argument('--execute', metavar='MANIFEST', help='Скачать страницы из JSONL-манифеста без обхода сайта')
+    p.add_argument('--shard', metavar='K/N', help='С --execute: скачивать только шард K из N (хэш по пути файла), например 3/8')
+    p.add_argument('--repair', metavar='BADLIST', help='Перекачать только битые страницы из списка tools/scrub_library.py (JSONL)')
+    p.add_argument('--order', choices=['reading', 'latest'], help='Очерёдность глав: reading — по порядку чтения (по умолчанию, app.order), latest — сначала новые')
+    p.add_argument('--batch', metavar='FILE', help="Пакетный режим: URL глав, URL тайтлов или slug по одному в строке ('-' — stdin); всё в одном процессе и одной сессии, на каждую строку печатается код результата")
     return p
 
 
@@ -114,14 +128,50 @@ def main():
     parser = build_arg_parser()
     args = parser.parse_args()
 
+    # Валидация аргументов (до тяжёлых импортов и чтения конфига)
+    if not (args.chapter_url or args.slug or args.slug_list or args.watch or args.execute or args.batch or args.repair):
+        print("[ERR] Укажите --chapter-url, --slug, --slug-list, --watch, --execute, --batch или --repair")
+        return 2
+
+    from bs4 import BeautifulSoup
+    from session_manager import SessionManager
+    from extractor import extract_image_candidates
+
     cfg_path = os.path.join(os.path.dirname(__file__), 'config', 'config.yaml')
 
+    sm = SessionManager(cfg_path)
+
     # Логи
-    log_dir = os.path.join(os.path.dirname(__file__), 'logs')
-    setup_logging(log_dir)
+    lcfg = sm.config.get('logging', {}) or {}
+    log_dir = lcfg.get('dir') or 'logs'
+    if not os.path.isabs(log_dir):
+        log_dir = os.path.join(os.path.dirname(__file__), log_dir)
+    log_path = setup_logging(log_dir, level=str(lcfg.get('level', 'INFO')),
+                             fmt='json' if args.log_json else str(lcfg.get('format', 'text')))
     log = logging.getLogger('CLI')
-
-    sm = SessionManager(cfg_path)
+    if args.profile:
+        pcfg = lcfg.get('profile', {}) or {}
+        profiling.start(os.path.splitext(log_path)[0] + '.profile',
+                        frames=int(pcfg.get('tracemalloc_frames', 1)), mem_every=int(pcfg.get('mem_every', 1)))
+    base_downloads = os.path.join(os.path.dirname(__file__), 'Downloads')
+    hedger = limiter = None
+    if not args.dry_run:
+        from downloader import Hedger
+        from throttle import BandwidthLimiter
+        # Хеджирование медленных запросов; латентность учится за весь прогон
+        hedger = Hedger.from_config(sm.config.get('app', {}).get('hedge'))
+        # Общий на процесс лимит полосы (и замер скорости для прогресса)
+        limiter = BandwidthLimiter.from_config(sm.config.get('bandwidth'))
+    chunk_size = int(sm.config.get('app', {}).get('chunk_size_kb', 256)) * 1024
+    # Общий пул скачивания с приоритетами (--slug, --batch, --watch), иначе пул создаётся на главу
+    shared_pool = None
+    from scheduler import PriorityExecutor, ReadableTracker, TitleTurns, chapter_priority
+    order = args.order or str(sm.config.get('app', {}).get('order', 'reading'))
+    # сколько глав держать в работе одновременно: пока докачивается одна,
+    # следующая уже разобрана и её страницы стоят в очереди за ней
+    prefetch = 1 if (args.plan or args.dry_run) else max(1, int(sm.config.get('app', {}).get('prefetch_chapters', 2)))
+    readable = ReadableTracker()
+    turns = TitleTurns()
 
     def parse_chapter_id(ch_id: str):
         m = re.match(r'^(\d+)-(\d+)$', ch_id)
@@ -151,11 +201,11 @@ def main():
         path = '/' + '/'.join(parts)
         return f"{up.scheme}://{up.netloc}{path}"
 
-    def get_all_chapter_urls(manga_url: str):
-        log.info('CLI: GET MANGA: %s', manga_url)
-        resp = sm.get(manga_url)
-        html_manga = resp.text
-        soup = BeautifulSoup(html_manga, 'lxml')
+    def _stream_chapter_list(manga_url: str, on_found=None):
+        """Потоковая загрузка и разбор списка глав (chapter_ids.ChapterListParser):
+        on_found(cid, url) вызывается для каждой новой главы, пока страница ещё
+        качается; возвращается итоговый упорядоченный список URL.
+        """
         # Ищем все ссылки на главы в рамках этого же slug
         up = urlparse(manga_url)
         parts = [x for x in up.path.split('/') if x]
@@ -165,50 +215,72 @@ def main():
             slug = parts[mi + 1]
         except Exception:
             pass
-        anchors = soup.select('a[href*="/chapter/"]')
-        urls = []
-        for a in anchors:
-            href = a.get('href')
-            if not href:
-                continue
-            full = href if href.startswith('http') else urljoin(manga_url, href)
-            if slug and f"/manga/{slug}/chapter/" not in full:
-                continue
-            urls.append(full)
-        # Дополнительно: парсим все вхождения /chapter/A-B(.C...) из HTML (на случай скрытых/ленивых блоков)
-        import re as _re
-        for m in _re.finditer(r"/manga/([\w\-]+)/chapter/(\d+)-([0-9][0-9\.]*?)\b", html_manga):
-            sl2, a, b = m.group(1), m.group(2), m.group(3)
-            if slug and sl2 != slug:
-                continue
-            urls.append(urljoin(manga_url, f"/manga/{sl2}/chapter/{a}-{b}"))
-        # нормализуем и уникализируем
-        seen = {}
-        for u in urls:
-            upu = urlparse(u)
-            p2 = [x for x in upu.path.split('/') if x]
-            cid = None
-            try:
-                cix = p2.index('chapter')
-                cid = p2[cix + 1]
-            except Exception:
-                pass
-            if cid:
-                seen[cid] = u
-        # сортировка по числам (A, B)
-        def sort_key(item):
-            cid, urlv = item
-            m = re.match(r'^(\d+)-([0-9][0-9\.]*)$', cid)
-            if m:
-                major = int(m.group(1))
-                minor_str = m.group(2)
-                parts = [int(x) for x in minor_str.split('.')]
-                return (major, parts)
-            return (1 << 30, [99999])
-        ordered = [u for cid, u in sorted(seen.items(), key=sort_key)]
+
+        def consume(chunks):
+            parser = chapter_ids.ChapterListParser(manga_url, slug, on_found)
+            for chunk in chunks:
+                parser.feed(chunk)
+            return parser.close()
+
+        log.info('CLI: GET MANGA: %s', manga_url)
+        with profiling.stage('chapter_list'):
+            ordered = sm.get_stream(manga_url, consume)
         log.info('Глав найдено: %d', len(ordered))
         return ordered
 
+    def get_all_chapter_urls(manga_url: str):
+        return _stream_chapter_list(manga_url)
+
+    def iter_chapter_urls(manga_url: str):
+        """URL глав тайтла по мере разбора списка, в порядке чтения.
+
+        Пока страница качается, глава отдаётся, как только следом найдена
+        глава с большим id, — для списка по возрастанию первая глава стартует
+        почти сразу. Если список идёт не по возрастанию (например, новые
+        сверху), ранний старт выключается и всё отдаётся после конца разбора
+        в итоговом порядке. Дубли по id отбрасываются (в том числе при
+        повторе запроса списка).
+        """
+        import queue
+        import threading
+        q: queue.SimpleQueue = queue.SimpleQueue()
+        result = {}
+        finished = threading.Event()
+
+        def produce():
+            try:
+                with profiling.thread_profile():
+                    result['urls'] = _stream_chapter_list(manga_url, lambda cid, u: q.put((cid, u)))
+            except BaseException as e:
+                result['error'] = e
+            finally:
+                finished.set()
+                q.put(None)
+
+        threading.Thread(target=produce, name='chapter-list', daemon=True).start()
+        done_ids: set[str] = set()
+        pending = None   # (ключ, id, url): найдена, но ещё не подтверждена следующей
+        while not finished.is_set():
+            item = q.get()
+            if item is None:
+                break
+            cid, u = item
+            key = chapter_ids.sort_key(cid)
+            if pending is not None:
+                if key <= pending[0]:
+                    break
+                done_ids.add(pending[1])
+                yield pending[2]
+            pending = (key, cid, u)
+        finished.wait()
+        if 'error' in result:
+            raise result['error']
+        for u in result['urls']:
+            cid = chapter_ids.chapter_id_from_url(u)
+            if cid not in done_ids:
+                done_ids.add(cid)
+                yield u
+
     def find_next_chapter_url(html: str, chapter_url: str) -> str | None:
         """Пытается найти URL следующей главы на странице главы.
         Стратегии:
@@ -242,19 +314,8 @@ def main():
         return None
 
     def parse_chapter_id_from_url(u: str):
-        up = urlparse(u)
-        parts = [x for x in up.path.split('/') if x]
-        try:
-            ci = parts.index('chapter')
-            cid = parts[ci + 1]
-            m = re.match(r'^(\d+)-([0-9][0-9\.]*)$', cid)
-            if m:
-                major = int(m.group(1))
-                minor_parts = tuple(int(x) for x in m.group(2).split('.'))
-                return major, minor_parts
-        except Exception:
-            pass
-        return None
+        cid = chapter_ids.chapter_id_from_url(u)
+        return chapter_ids.parse_id(cid) if cid else None
 
     def chapter_exists(u: str) -> bool:
         try:
@@ -291,17 +352,33 @@ def main():
             return cand2
         return None
 
-    def process_one(chapter_url: str):
-        log.info('CLI: GET HTML: %s', chapter_url)
-        resp = sm.get(chapter_url)
+    def process_one(chapter_url: str, turn: int | None = None):
+        """turn — ход главы в очереди тайтлов (turns.take); без него берётся
+        здесь. Ход освобождается по завершении главы.
+        """
+        if turn is None:
+            turn = turns.take(derive_manga_url(chapter_url))
         try:
-            status = resp.status_code
-        except Exception:
-            status = 'NA'
-        html = resp.text
+            # главы идут и в потоках пула chapter — до 3.12 их виден только так
+            with profiling.thread_profile():
+                return _process_one(chapter_url, turn)
+        finally:
+            turns.release(turn)
+
+    def _process_one(chapter_url: str, turn: int):
+        log.info('CLI: GET HTML: %s', chapter_url)
+        with profiling.stage('fetch_html'):
+            resp = sm.get(chapter_url)
+            try:
+                status = resp.status_code
+            except Exception:
+                status = 'NA'
+            html = resp.text
         log.info('CLI: HTTP %s, HTML length=%d', status, len(html) if isinstance(html, str) else -1)
 
-        items = extract_image_urls(html)
+        with profiling.stage('extract'):
+            cands = extract_image_candidates(html)
+        items = [(n, urls[0]) for n, urls in cands]
         if not items:
             try:
                 from bs4 import BeautifulSoup as _BS
@@ -313,58 +390,269 @@ def main():
             log.error('Не удалось извлечь изображения из HTML. title="%s" snippet=%r', _title, snippet)
             return 2, html
         items = normalize_urls(chapter_url, items)
+        # запасные URL (зеркала/разрешения из srcset) для хеджирования и ретраев
+        alternates = {n: [urljoin(chapter_url, u) for u in urls[1:]] for n, urls in cands if len(urls) > 1}
         log.info('Найдено страниц: %d', len(items))
         for n, u in items[:5]:
             log.info('PAGE %d: %s', n, u)
 
-        base_downloads = os.path.join(os.path.dirname(__file__), 'Downloads')
-        out_dir = args.out or derive_out_dir(base_downloads, chapter_url, html)
+        if args.plan:
+            from manifest import make_records, write_records
+            manga_slug, tom_label, glava_label, _ = extract_meta(html, chapter_url)
+            out_dir = args.out or os.path.join(base_downloads, manga_slug, tom_label, glava_label)
+            recs = make_records(manga_slug, tom_label, glava_label, items, chapter_url, out_dir, base_downloads,
+                                alternates=alternates)
+            with open(args.plan, 'a', encoding='utf-8') as mf:
+                write_records(mf, recs)
+            log.info('PLAN: %s -> %d записей', chapter_url, len(recs))
+            return 0, html
+
+        with profiling.stage('extract'):
+            out_dir = args.out or derive_out_dir(base_downloads, chapter_url, html)
         os.makedirs(out_dir, exist_ok=True)
 
         if args.dry_run:
+            # в --batch stdout занят кодами результатов строк
+            out = sys.stderr if args.batch else sys.stdout
             for n, u in items:
-                print(n, u)
+                print(n, u, file=out)
             return 0, html
 
+        from downloader import download_images
         try:
-            download_images(sm.session, items, out_dir, referer=chapter_url, concurrency=int(sm.config['app']['concurrency']))
+            with profiling.stage('download'):
+                download_images(sm.session, items, out_dir, referer=chapter_url, concurrency=int(sm.config['app']['concurrency']),
+                                executor=shared_pool, alternates=alternates, hedger=hedger, policy=sm.policy, force=args.force,
+                                limiter=limiter, chunk_size=chunk_size, group=derive_manga_url(chapter_url),
+                                priority=chapter_priority(chapter_ids.chapter_id_from_url(chapter_url), order, turn))
             log.info('Готово: %s', out_dir)
+            readable.mark(out_dir, len(items), chapter_url)
             return 0, html
         except Exception as e:
             log.exception('Ошибка при скачивании: %s', e)
             return 2, html
+        finally:
+            profiling.mem_snapshot(chapter_url.rstrip('/').rsplit('/', 1)[-1])
 
-    # Валидация аргументов
-    if not args.chapter_url and not args.slug:
-        print("[ERR] Укажите либо --chapter-url, либо --slug")
-        return 2
-
-    # Режим скачивания по slug без явного chapter-url
-    if args.slug and not args.chapter_url:
-        base_site = (args.site or 'https://mangapoisk.io').rstrip('/')
-        manga_url = f"{base_site}/manga/{args.slug}?tab=chapters"
-        all_urls = get_all_chapter_urls(manga_url)
+    def process_title(manga_url: str) -> int:
+        """Все главы тайтла в порядке order. До prefetch глав обрабатываются
+        одновременно; их страницы делят общий пул по приоритету глав, так что
+        глава, идущая раньше, и дочитывается (становится readable) раньше.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        if order == 'latest':
+            urls = list(reversed(get_all_chapter_urls(manga_url)))
+        else:
+            urls = iter_chapter_urls(manga_url)
         visited: set[str] = set()
-        if all_urls:
-            for u in all_urls:
+        if prefetch <= 1 or shared_pool is None:
+            for u in urls:
                 if u in visited:
                     continue
                 visited.add(u)
                 st, _ = process_one(u)
                 if st != 0:
                     return st
+            return 0
+        inflight = []
+        with ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix='chapter') as chapters:
+            for u in urls:
+                if u in visited:
+                    continue
+                visited.add(u)
+                if len(inflight) >= prefetch:
+                    st, _ = inflight.pop(0).result()
+                    if st != 0:
+                        break
+                # ход берётся здесь, в порядке глав, а не в потоке главы
+                inflight.append(chapters.submit(process_one, u, turns.take(derive_manga_url(u))))
+            else:
+                st = 0
+            # дожидаемся уже начатых глав; код — первой неудачной по порядку
+            for fut in inflight:
+                st2, _ = fut.result()
+                if st == 0:
+                    st = st2
+        return st
+
+    def process_line(line: str, base_site: str) -> int:
+        """Строка --batch: URL главы, URL тайтла или slug."""
+        if '/chapter/' in line:
+            st, _ = process_one(line)
+            return st
+        if '/manga/' in line:
+            up = urlparse(line)
+            parts = [x for x in up.path.split('/') if x]
+            slug = parts[parts.index('manga') + 1]
+            return process_title(f"{up.scheme}://{up.netloc}/manga/{slug}?tab=chapters")
+        return process_title(f"{base_site}/manga/{line}?tab=chapters")
+
+    # Исполнение манифеста: только скачивание, без обхода сайта
+    if args.execute:
+        from downloader import download_images
+        from manifest import read_manifest, parse_shard, shard_of, group_by_chapter
+        try:
+            k, n = parse_shard(args.shard) if args.shard else (1, 1)
+        except ValueError as e:
+            print(f"[ERR] {e}")
+            return 2
+        recs = [r for r in read_manifest(args.execute) if shard_of(r, n) == k]
+        groups = group_by_chapter(recs)
+        log.info('EXECUTE: %s, шард %d/%d: страниц=%d, глав=%d', args.execute, k, n, len(recs), len(groups))
+        failed = 0
+        for (rel_dir, referer, pages), (items, alternates) in groups.items():
+            out_dir = os.path.join(base_downloads, rel_dir)
+            try:
+                download_images(sm.session, items, out_dir, referer=referer,
+                                concurrency=int(sm.config['app']['concurrency']), total=pages,
+                                alternates=alternates, hedger=hedger, policy=sm.policy, force=args.force,
+                                limiter=limiter, chunk_size=chunk_size)
+            except Exception as e:
+                log.exception('Ошибка при скачивании %s: %s', out_dir, e)
+                failed += 1
+        return 2 if failed else 0
+
+    # Перекачка битых страниц: файлы из списка удаляются, их главы проходятся
+    # заново — целые страницы на диске пропускаются, качаются только удалённые
+    if args.repair:
+        from manifest import read_manifest
+        from scheduler import READABLE_FILE
+        base_site = (args.site or 'https://mangapoisk.io').rstrip('/')
+        try:
+            recs = list(read_manifest(args.repair))
+        except (OSError, ValueError) as e:
+            print(f"[ERR] --repair: {e}")
+            return 2
+        # перекачка идёт в Downloads репозитория — список по другому --base не годится
+        here = os.path.realpath(base_downloads)
+        other = {r['base'] for r in recs if r.get('base') and os.path.realpath(r['base']) != here}
+        if other:
+            print(f"[ERR] --repair: список составлен для {', '.join(sorted(other))}, а скачивание идёт в {here}")
+            return 2
+        chapters: dict = {}   # каталог главы -> запись (с url, если известен)
+        for rec in recs:
+            path = os.path.join(base_downloads, rec['path'])
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            ch_dir = os.path.dirname(path)
+            if rec.get('url') or ch_dir not in chapters:
+                chapters[ch_dir] = rec
+        lists: dict = {}
+
+        def find_chapter_url(rec) -> str | None:
+            # Глава скачана до появления URL в маркере: ищем её в списке глав
+            # тайтла по имени каталогов (Том <major> / Глава <minor>)
+            slug = rec['slug']
+            if slug not in lists:
+                lists[slug] = get_all_chapter_urls(f"{base_site}/manga/{slug}?tab=chapters")
+            want = rec['chapter'].split(' ', 1)[-1]
+            cands = []
+            for u in lists[slug]:
+                m = chapter_ids.CHAPTER_ID_RE.match(chapter_ids.chapter_id_from_url(u) or '')
+                if m and m.group(2) == want:
+                    cands.append((m.group(1), u))
+            for major, u in cands:
+                if f"Том {_pad2(major)}" == rec['volume']:
+                    return u
+            return cands[0][1] if len(cands) == 1 else None
+
+        log.info('REPAIR: %s: страниц=%d, глав=%d', args.repair, len(recs), len(chapters))
+        failed = 0
+        with PriorityExecutor(int(sm.config['app']['concurrency'])) as pool:
+            shared_pool = pool
+            for ch_dir, rec in chapters.items():
+                try:
+                    os.remove(os.path.join(ch_dir, READABLE_FILE))
+                except FileNotFoundError:
+                    pass
+                url = rec.get('url') or find_chapter_url(rec)
+                if not url:
+                    log.error('REPAIR: не найден URL главы для %s', ch_dir)
+                    failed += 1
+                    continue
+                st, _ = process_one(url)
+                failed += st != 0
+        return 2 if failed else 0
+
+    if args.plan:
+        # манифест пишется дозаписью по главам — начинаем с пустого файла
+        open(args.plan, 'w', encoding='utf-8').close()
+
+    # Пакетный режим: одна тёплая сессия (соединения, куки, пул потоков) на все строки.
+    # Строки читаются по мере поступления; на каждую в stdout печатается
+    # "<код>\t<строка>" (0 — успех), ошибка строки не прерывает пакет.
+    if args.batch:
+        base_site = (args.site or 'https://mangapoisk.io').rstrip('/')
+        try:
+            src = sys.stdin if args.batch == '-' else open(args.batch, 'r', encoding='utf-8')
+        except OSError as e:
+            print(f"[ERR] --batch: {e}")
+            return 2
+        done = failed = 0
+        try:
+            with PriorityExecutor(int(sm.config['app']['concurrency'])) as pool:
+                shared_pool = pool
+                for raw in src:
+                    line = raw.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    try:
+                        st = process_line(line, base_site)
+                    except Exception as e:
+                        log.exception('BATCH: ошибка %s: %s', line, e)
+                        st = 2
+                    done += 1
+                    failed += st != 0
+                    print(f"{st}\t{line}", flush=True)
+        finally:
+            if src is not sys.stdin:
+                src.close()
+        log.info('BATCH: строк=%d, ошибок=%d', done, failed)
+        return 2 if failed else 0
+
+    # Режим наблюдения: опрос списка тайтлов по расписанию, скачиваются только новые главы
+    if args.watch:
+        from watcher import run_watch
+        wcfg = sm.config.get('watch', {}) or {}
+        base_site = (args.site or 'https://mangapoisk.io').rstrip('/')
+        state_path = wcfg.get('state_file') or os.path.join(os.path.dirname(__file__), 'state', 'watch.json')
+        if not os.path.isabs(state_path):
+            state_path = os.path.join(os.path.dirname(__file__), state_path)
+
+        def list_chapters(slug: str):
+            urls = get_all_chapter_urls(f"{base_site}/manga/{slug}?tab=chapters")
+            return list(reversed(urls)) if order == 'latest' else urls
+
+        def process_chapter(u: str) -> int:
+            st, _ = process_one(u)
+            return st
+
+        with PriorityExecutor(int(sm.config['app']['concurrency'])) as pool:
+            shared_pool = pool
+            return run_watch(args.watch, state_path, list_chapters, process_chapter,
+                             interval=float(wcfg.get('interval', 3600)),
+                             jitter=float(wcfg.get('jitter', 0.2)),
+                             once=args.watch_once,
+                             parallel=int(wcfg.get('parallel_titles', 2)))
+
+    # Режим скачивания по slug (или списку slug) без явного chapter-url
+    if (args.slug or args.slug_list) and not args.chapter_url:
+        from watcher import load_watchlist
+        base_site = (args.site or 'https://mangapoisk.io').rstrip('/')
+        slugs = load_watchlist(args.slug_list) if args.slug_list else [args.slug]
+        with PriorityExecutor(int(sm.config['app']['concurrency'])) as pool:
+            shared_pool = pool
+            for slug in slugs:
+                st = process_title(f"{base_site}/manga/{slug}?tab=chapters")
+                if st != 0:
+                    return st
         return 0
 
     # Основной + авто-продолжение
     # Определим текущий идентификатор главы
-    up0 = urlparse(args.chapter_url)
-    parts0 = [x for x in up0.path.split('/') if x]
-    ch_id = None
-    try:
-        ci0 = parts0.index('chapter')
-        ch_id = parts0[ci0 + 1]
-    except Exception:
-        pass
+    ch_id = chapter_ids.chapter_id_from_url(args.chapter_url)
 
     if args.all:
         # 1) Полный список (включает дробные подглавы)
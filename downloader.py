@@ -2,74 +2,624 @@
 # Licensed under end-user license agreement (EULA). See LICENSE for details.
 # Use permitted only in original, unmodified form for personal/internal, non-commercial purposes.
 import os
+import json
 import math
 import time
+import heapq
+import queue
+import atexit
+import socket
 import logging
-from typing import List, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import tempfile
+import itertools
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed, wait
 import requests
 
+try:
+    import fcntl
+except ImportError:  # Windows: без межпроцессной блокировки сайдкара
+    fcntl = None
+
+from retry_policy import RetryPolicy, Deadline, HttpStatusError, parse_retry_after
+from throttle import BandwidthLimiter
+import profiling
+
 
 def _pad(num: int, total: int) -> str:
     width = max(3, int(math.log10(total)) + 1 if total > 0 else 3)
     return str(num).zfill(width)
 
 
-def download_images(session: requests.Session, items: List[Tuple[int, str]], out_dir: str, referer: str, concurrency: int = 6) -> None:
+def page_filename(save_num: int, total: int, url: str) -> str:
+    """Локальное имя страницы: номер с паддингом по числу страниц главы + расширение из URL."""
+    ext = '.jpg'
+    for cand in ['.jpg', '.jpeg', '.png', '.webp']:
+        if url.lower().endswith(cand):
+            ext = cand
+            break
+    return f"{_pad(save_num, total)}{ext}"
+
+
+class _Cancelled(Exception):
+    pass
+
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+# Буфер чтения на поток: переиспользуется между страницами вместо нового bytes на каждый кусок
+_buffers = threading.local()
+
+
+def _buffer(size: int) -> memoryview:
+    buf = getattr(_buffers, 'buf', None)
+    if buf is None or len(buf) != size:
+        buf = _buffers.buf = bytearray(size)
+    return memoryview(buf)
+
+
+def _preallocate(f, length: int) -> None:
+    # Резервируем место под файл заранее — меньше фрагментации и метаданных на запись
+    if length > 0 and hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(f.fileno(), 0, length)
+        except OSError:
+            pass
+
+
+def _write_all(f, data) -> None:
+    # небуферизованный FileIO.write может записать меньше переданного
+    data = memoryview(data)
+    while data:
+        data = data[f.write(data):]
+
+
+def _stream_to_file(session: requests.Session, url: str, referer: str, timeout: float, path: str,
+                    cancel: Optional[threading.Event] = None, headers: Optional[Dict[str, str]] = None,
+                    on_chunk: Optional[Callable[[int], None]] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    on_response: Optional[Callable[[requests.Response], None]] = None) -> Optional[Dict]:
+    """Скачивает url в path. Возвращает валидаторы ответа {etag, last_modified, size}
+    или None, если сервер ответил 304 на условный запрос (файл не создаётся).
+    on_response(r) получает ответ сразу после заголовков — чтобы его можно
+    было прервать из другого потока (_abort_response).
+    """
+    hdrs = {'Referer': referer}
+    if headers:
+        hdrs.update(headers)
+    r = session.get(url, headers=hdrs, timeout=timeout, stream=True)
+    try:
+        if on_response is not None:
+            on_response(r)
+        if cancel is not None and cancel.is_set():
+            raise _Cancelled()
+        logging.getLogger('Downloader').debug("HTTP %s %s", r.status_code, url)
+        if r.status_code == 304 and headers:
+            return None
+        if r.status_code != 200:
+            raise HttpStatusError(r.status_code, parse_retry_after(r.headers.get('Retry-After')))
+        ctype = r.headers.get('Content-Type', '')
+        if 'image' not in ctype:
+            raise Exception(f"Bad content-type: {ctype}")
+        try:
+            length = int(r.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = 0
+        encoded = r.headers.get('Content-Encoding', 'identity').lower() not in ('', 'identity')
+        size = 0
+        with open(path, 'wb', buffering=0) as f:
+            if encoded:
+                # сжатый ответ: распаковку делает requests
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    if cancel is not None and cancel.is_set():
+                        raise _Cancelled()
+                    if chunk:
+                        if on_chunk is not None:
+                            on_chunk(len(chunk))
+                        _write_all(f, chunk)
+                        size += len(chunk)
+            else:
+                # читаем сырой поток urllib3 прямо в переиспользуемый буфер
+                prof = profiling.enabled()
+                _preallocate(f, length)
+                mv = _buffer(chunk_size)
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        raise _Cancelled()
+                    n = r.raw.readinto(mv)
+                    if not n:
+                        break
+                    if on_chunk is not None:
+                        on_chunk(n)
+                    if prof:
+                        t = time.perf_counter()
+                        _write_all(f, mv[:n])
+                        profiling.add('disk_write', time.perf_counter() - t)
+                    else:
+                        _write_all(f, mv[:n])
+                    size += n
+                if length and size != length:
+                    raise Exception(f"Incomplete body: {size} of {length} bytes")
+        return {'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified'), 'size': size}
+    finally:
+        r.close()
+
+
+PAGE_META_FILE = '.pages.json'
+
+
+def load_page_meta(out_dir: str) -> Dict[str, Dict]:
+    """Сайдкар главы: имя файла -> {etag, last_modified, size}."""
+    try:
+        with open(os.path.join(out_dir, PAGE_META_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_page_meta(out_dir: str, updates: Dict[str, Dict]) -> None:
+    """Дописывает записи updates в сайдкар главы. Файл перечитывается и
+    сливается под блокировкой прямо перед записью: главу могут одновременно
+    качать несколько процессов (шарды --execute), каждый со своей частью страниц.
+    """
+    path = os.path.join(out_dir, PAGE_META_FILE)
+    with open(path + '.lock', 'a') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        meta = load_page_meta(out_dir)
+        meta.update(updates)
+        fd, tmp = tempfile.mkstemp(prefix=PAGE_META_FILE + '.', suffix='.tmp', dir=out_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=0, sort_keys=True)
+            os.replace(tmp, path)
+        except BaseException:
+            _remove_quiet(tmp)
+            raise
+
+
+def conditional_headers(entry: Optional[Dict], local_size: int) -> Optional[Dict[str, str]]:
+    # Валидаторам верим, только если локальный файл совпадает по размеру с записанным
+    if not entry or entry.get('size') != local_size:
+        return None
+    h = {}
+    if entry.get('etag'):
+        h['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        h['If-Modified-Since'] = entry['last_modified']
+    return h or None
+
+
+def _abort_response(r: requests.Response) -> None:
+    """Прерывает чтение ответа из другого потока: shutdown сокета будит
+    заблокированный recv (close() файла-обёртки этого не делает), поток-
+    владелец сам закроет ответ в своём finally.
+    """
+    sock = getattr(getattr(r.raw, '_connection', None), 'sock', None)
+    if sock is None:
+        try:
+            sock = r.raw._fp.fp.raw._sock
+        except AttributeError:
+            return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+# Временные .partN хеджированных запросов, которые ещё могут существовать:
+# проигравший поток удаляет свой файл сам, а то, что не успел к выходу
+# процесса, подчищается при выходе.
+_live_parts = set()
+_parts_lock = threading.Lock()
+
+
+def _track_part(path: str, live: bool) -> None:
+    with _parts_lock:
+        if live:
+            _live_parts.add(path)
+        else:
+            _live_parts.discard(path)
+
+
+def _sweep_parts() -> None:
+    with _parts_lock:
+        paths = list(_live_parts)
+        _live_parts.clear()
+    for p in paths:
+        _remove_quiet(p)
+
+
+atexit.register(_sweep_parts)
+
+
+class LatencyTracker:
+    """Скользящее окно длительностей скачивания страниц за прогон."""
+
+    def __init__(self, window: int = 256):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            data = sorted(self._samples)
+        idx = min(len(data) - 1, max(0, int(round(q * (len(data) - 1)))))
+        return data[idx]
+
+
+class Hedger:
+    """Хеджированные запросы: если страница качается дольше перцентиля
+    латентности, выученного за прогон, параллельно стартует второй запрос —
+    к зеркалу из srcset или к тому же URL по новому соединению (отдельная
+    сессия). Побеждает первый успешный, проигравший отменяется.
+    """
+
+    def __init__(self, percentile: float = 0.95, min_samples: int = 20, min_delay: float = 2.0):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.tracker = LatencyTracker()
+        self._hedge_session: Optional[requests.Session] = None
+        self._timer: Optional[_HedgeTimer] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict]) -> Optional['Hedger']:
+        cfg = cfg or {}
+        if not cfg.get('enabled', True):
+            return None
+        return cls(percentile=float(cfg.get('percentile', 0.95)),
+                   min_samples=int(cfg.get('min_samples', 20)),
+                   min_delay=float(cfg.get('min_delay', 2.0)))
+
+    def _second_session(self, session: requests.Session) -> requests.Session:
+        # отдельный пул соединений, чтобы хедж не сел в то же зависшее соединение
+        with self._lock:
+            if self._hedge_session is None:
+                s = requests.Session()
+                s.headers.update(session.headers)
+                s.cookies.update(session.cookies)
+                self._hedge_session = s
+            return self._hedge_session
+
+    def _schedule(self, delay: float, fn: Callable[[], None]) -> list:
+        with self._lock:
+            if self._timer is None:
+                self._timer = _HedgeTimer()
+            return self._timer.schedule(delay, fn)
+
+    def fetch(self, session: requests.Session, urls: List[str], path: str, referer: str, timeout: float,
+              headers: Optional[Dict[str, str]] = None,
+              on_chunk: Optional[Callable[[int], None]] = None,
+              chunk_size: int = DEFAULT_CHUNK_SIZE) -> Optional[Dict]:
+        """Возвращает результат _stream_to_file победившего запроса.
+
+        Основной запрос идёт в вызывающем потоке; поток для второго
+        запускается, только если хедж действительно сработал (его время
+        отслеживает общий _HedgeTimer). Победитель прерывает ответ
+        проигравшего (_abort_response), а не ждёт таймаута чтения.
+        """
+        log = logging.getLogger('Downloader')
+        race = _Race(path, referer, timeout, headers, on_chunk, chunk_size)
+        started = time.monotonic()
+        p = self.tracker.percentile(self.percentile, self.min_samples)
+        entry = None
+        if p is not None:
+            hedge_after = max(self.min_delay, p)
+            alt = urls[1] if len(urls) > 1 else urls[0]
+
+            def hedge():
+                if race.start(1, self._second_session(session), alt):
+                    log.debug("HEDGE %s после %.1fs -> %s", urls[0], hedge_after, alt)
+
+            entry = self._schedule(hedge_after, hedge)
+        race.start(0, session, urls[0], inline=True)
+        if entry is not None:
+            self._timer.cancel(entry)
+        idx, url, tmp, dt, meta = race.result()
+        if meta is not None:
+            os.replace(tmp, path)
+        _track_part(tmp, False)
+        self.tracker.add(time.monotonic() - started)
+        if idx:
+            log.debug("HEDGE WIN #%d %s (%.1fs)", idx, url, dt)
+        return meta
+
+
+class _HedgeTimer:
+    """Один поток на все отложенные хеджи процесса вместо таймера на страницу."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap: list = []
+        self._seq = itertools.count()
+        threading.Thread(target=self._loop, name='hedge-timer', daemon=True).start()
+
+    def schedule(self, delay: float, fn: Callable[[], None]) -> list:
+        entry = [time.monotonic() + delay, next(self._seq), fn]
+        with self._cond:
+            heapq.heappush(self._heap, entry)
+            self._cond.notify()
+        return entry
+
+    def cancel(self, entry: list) -> None:
+        with self._cond:
+            entry[2] = None
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    if self._heap and self._heap[0][0] <= now:
+                        fn = heapq.heappop(self._heap)[2]
+                        break
+                    self._cond.wait(self._heap[0][0] - now if self._heap else None)
+            if fn is not None:
+                try:
+                    fn()
+                except Exception:
+                    logging.getLogger('Downloader').exception('HEDGE: не удалось запустить запрос')
+
+
+class _Race:
+    """Гонка запросов одной страницы в Hedger.fetch."""
+
+    def __init__(self, path: str, referer: str, timeout: float, headers: Optional[Dict[str, str]],
+                 on_chunk: Optional[Callable[[int], None]], chunk_size: int):
+        self.path = path
+        self.args = (referer, timeout)
+        self.headers = headers
+        self.on_chunk = on_chunk
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+        self.results: queue.Queue = queue.Queue()
+        self.started = 0
+        self.decided = False
+        self.closed = False                       # новых участников больше не будет
+        self.cancels: Dict[int, threading.Event] = {}
+        self.responses: Dict[int, requests.Response] = {}
+
+    def start(self, idx: int, sess: requests.Session, url: str, inline: bool = False) -> bool:
+        with self.lock:
+            if self.closed or self.decided:
+                return False
+            self.started += 1
+            self.cancels[idx] = threading.Event()
+        if inline:
+            self._run(idx, sess, url)
+        else:
+            threading.Thread(target=self._run, args=(idx, sess, url), daemon=True).start()
+        return True
+
+    def _run(self, idx: int, sess: requests.Session, url: str) -> None:
+        tmp = f"{self.path}.part{idx}"
+        _track_part(tmp, True)
+
+        def on_response(r: requests.Response) -> None:
+            with self.lock:
+                self.responses[idx] = r
+                lost = self.decided
+            if lost:
+                _abort_response(r)
+
+        t0 = time.monotonic()
+        err = None
+        meta = None
+        try:
+            with profiling.thread_profile():
+                meta = _stream_to_file(sess, url, self.args[0], self.args[1], tmp, self.cancels[idx], self.headers,
+                                       self.on_chunk, self.chunk_size, on_response)
+        except Exception as e:
+            err = e
+        with self.lock:
+            self.responses.pop(idx, None)
+            lost = self.decided
+            if not lost and err is None:
+                self.decided = True
+                for ev in self.cancels.values():
+                    ev.set()
+                losers = list(self.responses.values())
+        if lost or err is not None:
+            _remove_quiet(tmp)
+            _track_part(tmp, False)
+            if lost:
+                return
+        else:
+            for r in losers:
+                _abort_response(r)
+        self.results.put((idx, url, tmp, err, time.monotonic() - t0, meta))
+
+    def result(self):
+        """Ждёт первого успешного участника; если все упали — последняя ошибка."""
+        with self.lock:
+            self.closed = True
+            n = self.started
+        last_err: Optional[Exception] = None
+        for _ in range(n):
+            idx, url, tmp, err, dt, meta = self.results.get()
+            if err is None:
+                return idx, url, tmp, dt, meta
+            last_err = err
+        raise last_err or RuntimeError('unknown download error')
+
+
+def _remove_quiet(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def download_images(session: requests.Session, items: List[Tuple[int, str]], out_dir: str, referer: str, concurrency: int = 6,
+                    executor: Optional[Executor] = None, total: Optional[int] = None,
+                    alternates: Optional[Dict[int, List[str]]] = None, hedger: Optional[Hedger] = None,
+                    policy: Optional[RetryPolicy] = None, progress_interval: float = 5.0,
+                    force: bool = False, limiter: Optional[BandwidthLimiter] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, group: Optional[str] = None,
+                    priority: Optional[Tuple] = None) -> None:
+    """total — число страниц главы для паддинга имён; нужно, когда items —
+    лишь часть главы (например, шард манифеста), по умолчанию len(items).
+    alternates — запасные URL страницы (зеркала из srcset): используются
+    хеджированным запросом и при повторных попытках.
+    policy — общая политика повторов (см. retry_policy); её chapter_deadline
+    ограничивает время всей главы.
+    force — перепроверить уже скачанные страницы условными запросами
+    (If-None-Match/If-Modified-Since по сайдкару .pages.json): перекачиваются
+    только изменившиеся на CDN.
+    limiter — общий ограничитель полосы; group — ключ честной доли в нём
+    (тайтл; по умолчанию каталог главы): одновременно качающиеся тайтлы
+    делят полосу поровну.
+    chunk_size — размер буфера чтения/записи страницы (байт).
+    priority — приоритет главы в общем пуле с submit_prioritized
+    (scheduler.PriorityExecutor): страницы уходят в работу по (priority, номер).
+    """
     os.makedirs(out_dir, exist_ok=True)
     log = logging.getLogger('Downloader')
 
-    total = len(items)
+    if total is None:
+        total = len(items)
+    if policy is None:
+        policy = RetryPolicy()
+    # бюджет главы считается с первой страницы, взятой в работу: в общем
+    # пуле страницы главы могут долго ждать за другими главами и тайтлами
+    chapter_deadline = Deadline(policy.chapter_deadline, start=False)
+    # Один снимок каталога главы вместо exists/getsize на каждую страницу
+    existing = {}
+    with os.scandir(out_dir) as it:
+        for e in it:
+            if e.is_file():
+                existing[e.name] = e.stat().st_size
+    todo = items if force else [(n, u) for n, u in items if existing.get(page_filename(n, total, u), 0) <= 0]
+    page_meta = load_page_meta(out_dir)
+    # только записи этого вызова: сливаются с файлом при сохранении
+    updated: Dict[str, Dict] = {}
+    meta_lock = threading.Lock()
+    on_chunk = None
+    group = group or out_dir
+    if limiter is not None:
+        limiter.register(group)
+
+        def on_chunk(n: int) -> None:
+            limiter.consume(group, n)
 
     def _fetch(save_num: int, url: str):
-        log.info("DOWNLOAD %s -> #%d", url, save_num)
+        with profiling.thread_profile():
+            return _fetch_page(save_num, url)
+
+    def _fetch_page(save_num: int, url: str):
+        chapter_deadline.start()
+        log.debug("DOWNLOAD %s -> #%d", url, save_num)
         # локальное имя по расширению
-        ext = '.jpg'
-        for cand in ['.jpg', '.jpeg', '.png', '.webp']:
-            if url.lower().endswith(cand):
-                ext = cand
-                break
-        name = f"{_pad(save_num, total)}{ext}"
+        name = page_filename(save_num, total, url)
         path = os.path.join(out_dir, name)
-        # На всякий случай гарантируем каталог (мог быть удалён или не создан при гонке)
-        try:
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-        except Exception as e:
-            log.warning("MKDIR failed for %s: %s", os.path.dirname(path), e)
-        if os.path.exists(path) and os.path.getsize(path) > 0:
-            log.debug("SKIP exists %s", name)
-            return name
-        # ретраи
-        attempts, delay, max_delay = 4, 1.0, 8.0
-        last_exc = None
-        for i in range(1, attempts + 1):
+        # размер берём из снимка каталога, без stat на каждую страницу
+        local_size = existing.get(name, 0)
+        cond = None
+        if local_size > 0:
+            if not force:
+                log.debug("SKIP exists %s", name)
+                return None
+            # --force: условный запрос, сервер ответит 304, если страница не менялась
+            with meta_lock:
+                cond = conditional_headers(page_meta.get(name), local_size)
+        urls = [url] + [u for u in (alternates or {}).get(save_num, []) if u != url]
+        tries = [0]
+
+        def fetch_once(order: List[str], timeout: float):
+            if hedger is not None:
+                return hedger.fetch(session, order, path, referer, timeout, cond, on_chunk, chunk_size)
+            # пишем во временный файл, чтобы при сбое не потерять прежнюю версию
+            tmp = path + '.part'
             try:
-                r = session.get(url, headers={'Referer': referer}, timeout=25, stream=True)
-                log.debug("HTTP %s %s (attempt %d)", r.status_code, url, i)
-                if r.status_code != 200:
-                    last_exc = Exception(f"HTTP {r.status_code}")
-                    raise last_exc
-                ctype = r.headers.get('Content-Type', '')
-                if 'image' not in ctype:
-                    last_exc = Exception(f"Bad content-type: {ctype}")
-                    raise last_exc
-                with open(path, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=1 << 14):
-                        if chunk:
-                            f.write(chunk)
-                log.info("SAVED %s", name)
-                return name
+                meta = _stream_to_file(session, order[0], referer, timeout, tmp, headers=cond,
+                                       on_chunk=on_chunk, chunk_size=chunk_size)
+            except Exception:
+                _remove_quiet(tmp)
+                raise
+            if meta is not None:
+                os.replace(tmp, path)
+            return meta
+
+        def attempt(timeout: float):
+            # каждая следующая попытка начинает со следующего зеркала
+            shift = tries[0] % len(urls)
+            tries[0] += 1
+            order = urls[shift:] + urls[:shift]
+            try:
+                try:
+                    return fetch_once(order, timeout)
+                except FileNotFoundError as e:
+                    # каталог главы удалили во время скачивания — восстановим и повторим
+                    # сразу: это локальная ошибка, политика повторов её не повторяет
+                    log.warning("FAIL #%d %s: %s", save_num, order[0], e)
+                    os.makedirs(out_dir, exist_ok=True)
+                    return fetch_once(order, timeout)
             except Exception as e:
-                last_exc = e
-                log.warning("FAIL #%d %s: %s", save_num, url, e)
-                if i < attempts:
-                    time.sleep(delay)
-                    delay = min(delay * 2, max_delay)
-        if last_exc:
-            raise last_exc
-        raise RuntimeError('unknown download error')
-
-    with ThreadPoolExecutor(max_workers=concurrency) as ex:
-        futures = [ex.submit(_fetch, n, url) for n, url in items]
+                log.warning("FAIL #%d %s: %s", save_num, order[0], e)
+                raise
+
+        meta = policy.call(url, attempt, deadline=chapter_deadline)
+        if meta is None:
+            log.debug("NOT MODIFIED %s", name)
+            return None
+        with meta_lock:
+            page_meta[name] = meta
+            updated[name] = meta
+        log.debug("SAVED %s", name)
+        return name
+
+    def _wait(futures) -> None:
+        # Вместо строки на каждую картинку — агрегированный прогресс главы:
+        # не чаще раза в progress_interval секунд и итог в конце.
+        t0 = last = time.monotonic()
+        done = len(items) - len(todo)
+        saved = 0
         for fut in as_completed(futures):
-            fut.result()
+            if fut.result() is not None:
+                saved += 1
+            done += 1
+            now = time.monotonic()
+            if done < len(items) and now - last >= progress_interval:
+                last = now
+                if limiter is not None:
+                    log.info("PROGRESS %s: %d/%d, %.2f MB/s", out_dir, done, len(items), limiter.rate_mb_s())
+                else:
+                    log.info("PROGRESS %s: %d/%d", out_dir, done, len(items))
+        log.info("CHAPTER %s: скачано=%d, без изменений=%d, за %.1fs", out_dir, saved, done - saved, time.monotonic() - t0)
+
+    futures: list = []
+    try:
+        # Общий пул (например, в режиме --watch) переиспользуем, иначе создаём свой на главу
+        if executor is not None:
+            if priority is not None and hasattr(executor, 'submit_prioritized'):
+                futures = [executor.submit_prioritized((priority, n), _fetch, n, url) for n, url in todo]
+            else:
+                futures = [executor.submit(_fetch, n, url) for n, url in todo]
+            _wait(futures)
+            return
+        if not todo:
+            _wait([])
+            return
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            futures = [ex.submit(_fetch, n, url) for n, url in todo]
+            _wait(futures)
+    finally:
+        # при ошибке главы снимаем её ждущие страницы и дожидаемся уже идущих,
+        # чтобы их валидаторы попали в сайдкар
+        for fut in futures:
+            fut.cancel()
+        wait(futures)
+        if limiter is not None:
+            limiter.unregister(group)
+        with meta_lock:
+            if updated:
+                save_page_meta(out_dir, updated)
@@ -6,14 +6,25 @@ from typing import List, Tuple
 import re
 
 
-def extract_image_urls(html: str) -> List[Tuple[int, str]]:
+def _srcset_urls(srcset: str) -> List[str]:
+    # "a.jpg 1x, b.jpg 2x" -> ['a.jpg', 'b.jpg']
+    out = []
+    for part in srcset.split(','):
+        tok = part.strip().split()
+        if tok:
+            out.append(tok[0])
+    return out
+
+
+def extract_image_candidates(html: str) -> List[Tuple[int, List[str]]]:
     """
-    Возвращает список (page_number, image_url), отсортированный по page_number.
-    Ищет теги <img class="page-image ...">. Берёт src, при отсутствии — data-src/srcset.
+    Возвращает список (page_number, [url, ...]), отсортированный по page_number.
+    Первый URL — основной (src, затем data-src, затем srcset), остальные —
+    зеркала/другие разрешения из data-src и всех кандидатов srcset.
     """
     soup = BeautifulSoup(html, 'lxml')
     imgs = soup.find_all('img', class_=lambda c: c and 'page-image' in c)
-    results: List[Tuple[int, str]] = []
+    results: List[Tuple[int, List[str]]] = []
     for img in imgs:
         num = None
         # порядок из data-number или из id="page-<N>"
@@ -29,20 +40,27 @@ def extract_image_urls(html: str) -> List[Tuple[int, str]]:
                     num = int(m.group(1))
                 except Exception:
                     pass
-        # URL из src / data-src / srcset
-        url = None
-        if img.has_attr('src'):
-            url = img['src']
-        elif img.has_attr('data-src'):
-            url = img['data-src']
-        elif img.has_attr('srcset'):
-            # берём первый источник
-            url = str(img['srcset']).split()[0]
-        if url and num is not None:
-            results.append((num, url))
+        # URL из src / data-src / srcset (все кандидаты, без дублей)
+        urls: List[str] = []
+        for attr in ('src', 'data-src'):
+            if img.has_attr(attr) and str(img[attr]).strip():
+                urls.append(str(img[attr]).strip())
+        if img.has_attr('srcset'):
+            urls.extend(_srcset_urls(str(img['srcset'])))
+        urls = list(dict.fromkeys(urls))
+        if urls and num is not None:
+            results.append((num, urls))
     # сортировка и удаление дублей по номеру (последний выигрывает)
     results.sort(key=lambda x: x[0])
     uniq = {}
     for n, u in results:
         uniq[n] = u
     return sorted(uniq.items(), key=lambda x: x[0])
+
+
+def extract_image_urls(html: str) -> List[Tuple[int, str]]:
+    """
+    Возвращает список (page_number, image_url), отсортированный по page_number.
+    Ищет теги <img class="page-image ...">. Берёт src, при отсутствии — data-src/srcset.
+    """
+    return [(n, urls[0]) for n, urls in extract_image_candidates(html)]
@@ -1,23 +1,79 @@
 # MangaToolkitV4 (c) 2025 S1riuSS3301
 # Licensed under end-user license agreement (EULA). See LICENSE for details.
 # Use permitted only in original, unmodified form for personal/internal, non-commercial purposes.
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
 from datetime import datetime
 
+TEXT_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
 
-def setup_logging(log_dir: str, level: str = "INFO") -> str:
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-запись на строку (JSON Lines)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class _ThreadQueueHandler(logging.handlers.QueueHandler):
+    # Очередь внутрипроцессная: запись не нужно форматировать/копировать
+    # в рабочем потоке — всё форматирование делает поток QueueListener.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for h in _listener.handlers:
+            h.close()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
+def setup_logging(log_dir: str, level: str = "INFO", fmt: str = "text") -> str:
+    """Асинхронное логирование: потоки только кладут записи в очередь,
+    форматирование и запись в файл/терминал выполняет отдельный поток.
+    fmt='json' — файл лога в формате JSON Lines (терминал остаётся текстовым).
+    """
+    global _listener
     os.makedirs(log_dir, exist_ok=True)
-    ts = datetime.now().strftime("run-%Y%m%d-%H%M%S.log")
-    log_path = os.path.join(log_dir, ts)
-
-    logging.basicConfig(
-        level=getattr(logging, level.upper(), logging.INFO),
-        format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-        handlers=[
-            logging.FileHandler(log_path, encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
+    ts = datetime.now().strftime("run-%Y%m%d-%H%M%S")
+    log_path = os.path.join(log_dir, ts + ('.jsonl' if fmt == 'json' else '.log'))
+
+    file_h = logging.FileHandler(log_path, encoding='utf-8')
+    file_h.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+    stream_h = logging.StreamHandler()
+    stream_h.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    _stop_listener()
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(q, file_h, stream_h, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(_ThreadQueueHandler(q))
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
     logging.getLogger("logging_setup").info("Логирование инициализировано: %s", log_path)
     return log_path
@@ -0,0 +1,87 @@
+# MangaToolkitV4 (c) 2025 S1riuSS3301
+# Licensed under end-user license agreement (EULA). See LICENSE for details.
+# Use permitted only in original, unmodified form for personal/internal, non-commercial purposes.
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from downloader import page_filename
+
+
+def make_records(slug: str, volume: str, chapter: str, items: List[Tuple[int, str]],
+                 referer: str, out_dir: str, base_downloads: str,
+                 alternates: Optional[Dict[int, List[str]]] = None) -> List[Dict]:
+    """Записи манифеста (по одной на страницу) для одной главы.
+    path хранится относительно base_downloads, если каталог внутри него —
+    чтобы манифест можно было исполнять на другой машине.
+    """
+    total = len(items)
+    rel_dir = out_dir
+    try:
+        r = os.path.relpath(out_dir, base_downloads)
+        if not r.startswith('..'):
+            rel_dir = r
+    except ValueError:
+        pass
+    recs = []
+    for n, u in items:
+        rec = {
+            'slug': slug,
+            'volume': volume,
+            'chapter': chapter,
+            'page': n,
+            'pages': total,
+            'url': u,
+            'referer': referer,
+            'path': os.path.join(rel_dir, page_filename(n, total, u)),
+        }
+        if alternates and alternates.get(n):
+            rec['alts'] = alternates[n]
+        recs.append(rec)
+    return recs
+
+
+def write_records(f, records: List[Dict]) -> None:
+    for rec in records:
+        f.write(json.dumps(rec, ensure_ascii=False) + '\n')
+    f.flush()
+
+
+def read_manifest(path: str) -> Iterator[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def parse_shard(s: str) -> Tuple[int, int]:
+    """'3/8' -> (3, 8). Номер шарда 1..N."""
+    try:
+        k, n = (int(x) for x in s.split('/', 1))
+    except Exception:
+        raise ValueError(f"Неверный формат шарда: {s!r}, ожидается K/N")
+    if n < 1 or not (1 <= k <= n):
+        raise ValueError(f"Неверный шард: {s!r}, нужно 1 <= K <= N")
+    return k, n
+
+
+def shard_of(rec: Dict, n: int) -> int:
+    # стабильный между процессами и машинами хэш (в отличие от hash())
+    h = hashlib.blake2b(rec['path'].encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(h, 'big') % n + 1
+
+
+def group_by_chapter(records: List[Dict]) -> Dict[Tuple[str, str, int], Tuple[List[Tuple[int, str]], Dict[int, List[str]]]]:
+    """(каталог главы, referer, число страниц) -> ([(page, url)], {page: [зеркала]})
+    в порядке манифеста.
+    """
+    groups: Dict[Tuple[str, str, int], Tuple[List[Tuple[int, str]], Dict[int, List[str]]]] = {}
+    for rec in records:
+        key = (os.path.dirname(rec['path']), rec['referer'], int(rec['pages']))
+        items, alts = groups.setdefault(key, ([], {}))
+        items.append((int(rec['page']), rec['url']))
+        if rec.get('alts'):
+            alts[int(rec['page'])] = list(rec['alts'])
+    return groups
@@ -0,0 +1,205 @@
+# MangaToolkitV4 (c) 2025 S1riuSS3301
+# Licensed under end-user license agreement (EULA). See LICENSE for details.
+# Use permitted only in original, unmodified form for personal/internal, non-commercial purposes.
+import atexit
+import contextlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Режим --profile: cProfile (все потоки), снимки tracemalloc по главам/томам
+# и разбивка wall-clock по стадиям. Пока профилирование не запущено, все
+# функции модуля — дешёвые no-op; cProfile/pstats/tracemalloc импортируются
+# только при start().
+
+_MAX_SPANS = 200_000
+
+# С 3.12 cProfile работает через sys.monitoring: профайлер один на процесс
+# и видит все потоки, второй enable() в потоке бросает ValueError.
+_PROCESS_WIDE = sys.version_info >= (3, 12)
+
+_prof: Optional['_Profiler'] = None
+
+
+class _Profiler:
+    def __init__(self, out_dir: str):
+        import cProfile
+        self.out_dir = out_dir
+        self.t0 = time.perf_counter()
+        self.lock = threading.Lock()
+        self.stages: Dict[str, List[float]] = {}    # имя -> [count, total, max]
+        self.spans: List[tuple] = []                # (имя, tid, начало, длительность)
+        self.thread_profiles: List['cProfile.Profile'] = []
+        self.local = threading.local()
+        self.snapshots = 0
+        self.mem_calls = 0
+        self.mem_every = 1
+        self.main = cProfile.Profile()
+        self.main_tid = threading.get_ident()
+
+    def add(self, name: str, start: float, dt: float) -> None:
+        with self.lock:
+            st = self.stages.get(name)
+            if st is None:
+                st = self.stages[name] = [0, 0.0, 0.0]
+            st[0] += 1
+            st[1] += dt
+            st[2] = max(st[2], dt)
+            if start >= 0 and len(self.spans) < _MAX_SPANS:
+                self.spans.append((name, threading.get_ident(), start - self.t0, dt))
+
+
+def enabled() -> bool:
+    return _prof is not None
+
+
+def start(out_dir: str, frames: int = 1, mem_every: int = 1) -> str:
+    """Включает профилирование; результаты пишутся в out_dir при stop()/выходе.
+    frames — глубина стека tracemalloc (каждый кадр удорожает и аллокации, и
+    снимки; для топа по строкам хватает одного), mem_every — снимок памяти
+    на каждую N-ю главу/том.
+    """
+    global _prof
+    import tracemalloc
+    os.makedirs(out_dir, exist_ok=True)
+    _prof = _Profiler(out_dir)
+    _prof.mem_every = max(1, mem_every)
+    tracemalloc.start(max(1, frames))
+    _prof.main.enable()
+    atexit.register(stop)
+    logging.getLogger('Profile').info('Профилирование включено: %s', out_dir)
+    return out_dir
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Замер wall-clock стадии (fetch_html, extract, download, compose, save, ...)."""
+    p = _prof
+    if p is None:
+        yield
+        return
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        p.add(name, t, time.perf_counter() - t)
+
+
+def add(name: str, seconds: float) -> None:
+    """Добавляет к стадии уже измеренное время (для мелких частых операций —
+    без отдельного интервала в trace).
+    """
+    p = _prof
+    if p is not None:
+        p.add(name, -1.0, seconds)
+
+
+@contextlib.contextmanager
+def thread_profile():
+    """cProfile в рабочем потоке: до 3.12 профайлер включается только в том
+    потоке, где вызван enable(), поэтому каждый поток пула получает свой и
+    они сливаются при stop(). На 3.12+ потоки уже видит основной профайлер.
+    """
+    p = _prof
+    if p is None or _PROCESS_WIDE or threading.get_ident() == p.main_tid:
+        # в потоке start() уже работает основной профайлер
+        yield
+        return
+    if getattr(p.local, 'active', False):
+        # вложенный вызов (racer хеджа внутри задачи пула) — профайлер уже включён
+        yield
+        return
+    prof = getattr(p.local, 'prof', None)
+    if prof is None:
+        import cProfile
+        prof = p.local.prof = cProfile.Profile()
+        with p.lock:
+            p.thread_profiles.append(prof)
+    try:
+        prof.enable()
+    except ValueError:
+        # другой профайлер уже активен — поток учтётся основным или никак
+        yield
+        return
+    p.local.active = True
+    try:
+        yield
+    finally:
+        p.local.active = False
+        prof.disable()
+
+
+def mem_snapshot(label: str, top: int = 25) -> None:
+    """Топ аллокаций tracemalloc после главы/тома -> mem-NNN-<label>.txt."""
+    p = _prof
+    if p is None:
+        return
+    with p.lock:
+        p.mem_calls += 1
+        if (p.mem_calls - 1) % p.mem_every:
+            return
+        p.snapshots += 1
+        n = p.snapshots
+    import tracemalloc
+    cur, peak = tracemalloc.get_traced_memory()
+    # фильтруем готовую статистику, а не все трассы снимка — это в разы дешевле
+    skip = (tracemalloc.__file__, '<frozen importlib._bootstrap>')
+    stats = [st for st in tracemalloc.take_snapshot().statistics('lineno')
+             if st.traceback[0].filename not in skip][:top]
+    safe = re.sub(r'[^\w.-]+', '_', label)[:80]
+    path = os.path.join(p.out_dir, f"mem-{n:03d}-{safe}.txt")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"# {label}\n# current={cur / 1e6:.1f} MB peak={peak / 1e6:.1f} MB\n")
+        for st in stats:
+            f.write(f"{st}\n")
+
+
+def stop() -> None:
+    """Останавливает профилирование и пишет:
+    profile.pstats — cProfile всех потоков (snakeviz, flameprof, gprof2dot);
+    trace.json — интервалы стадий в формате Trace Event (Perfetto, speedscope, chrome://tracing);
+    stages.json — суммарное время по стадиям.
+    """
+    global _prof
+    p = _prof
+    if p is None:
+        return
+    import pstats
+    import tracemalloc
+    _prof = None
+    p.main.disable()
+    stats = pstats.Stats(p.main)
+    for tp in p.thread_profiles:
+        tp.disable()
+        try:
+            stats.add(tp)
+        except TypeError:
+            # поток не успел ничего записать
+            pass
+    stats.dump_stats(os.path.join(p.out_dir, 'profile.pstats'))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    wall = time.perf_counter() - p.t0
+    summary = {
+        'wall_s': round(wall, 3),
+        'peak_traced_mb': round(peak / 1e6, 1),
+        'stages': {k: {'count': int(v[0]), 'total_s': round(v[1], 3), 'max_s': round(v[2], 3)}
+                   for k, v in sorted(p.stages.items(), key=lambda kv: -kv[1][1])},
+    }
+    with open(os.path.join(p.out_dir, 'stages.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=1)
+    events = [{'name': name, 'ph': 'X', 'pid': 1, 'tid': tid, 'ts': round(s * 1e6), 'dur': round(d * 1e6)}
+              for name, tid, s, d in p.spans]
+    with open(os.path.join(p.out_dir, 'trace.json'), 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events}, f)
+
+    log = logging.getLogger('Profile')
+    log.info('Профиль сохранён: %s (wall=%.1fs, peak=%.1f MB)', p.out_dir, wall, peak / 1e6)
+    for k, v in summary['stages'].items():
+        log.info('STAGE %-12s n=%d total=%.2fs max=%.2fs', k, v['count'], v['total_s'], v['max_s'])
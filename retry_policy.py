@@ -0,0 +1,237 @@
+# MangaToolkitV4 (c) 2025 S1riuSS3301
+# Licensed under end-user license agreement (EULA). See LICENSE for details.
+# Use permitted only in original, unmodified form for personal/internal, non-commercial purposes.
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, TypeVar
+from urllib.parse import urlparse
+
+import requests
+import urllib3
+
+import profiling
+
+T = TypeVar('T')
+
+DEFAULT_RETRY_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+
+# Временные сетевые сбои. Всё прочее (неверный Content-Type, локальные
+# OSError, ошибки в коде) не повторяется и не считается отказом хоста.
+# urllib3 указан отдельно: тело читается через r.raw, и его исключения
+# до requests не доходят.
+TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    urllib3.exceptions.ProtocolError,
+    urllib3.exceptions.IncompleteRead,
+    urllib3.exceptions.TimeoutError,
+)
+
+
+class HttpStatusError(Exception):
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class Deadline:
+    """Бюджет времени (например, на главу). None — без ограничения.
+    start=False — отсчёт начинается с первого start(), а не с создания.
+    """
+
+    def __init__(self, seconds: Optional[float], start: bool = True):
+        self.seconds = seconds or None
+        self.at: Optional[float] = None
+        if start:
+            self.start()
+
+    def start(self) -> None:
+        if self.at is None and self.seconds:
+            self.at = time.monotonic() + self.seconds
+
+    def remaining(self) -> Optional[float]:
+        if self.at is None:
+            return self.seconds
+        return self.at - time.monotonic()
+
+    def expired(self) -> bool:
+        r = self.remaining()
+        return r is not None and r <= 0
+
+
+class CircuitBreaker:
+    """Размыкатель на хост: после threshold подряд ошибок хост считается
+    лежащим на cooldown секунд, запросы к нему сразу падают. По истечении
+    пропускается один пробный запрос (half-open).
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def failure(self) -> bool:
+        """Возвращает True, если размыкатель только что открылся."""
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.threshold):
+                self._opened_at = time.monotonic()
+                self._probing = False
+                return True
+            return False
+
+    def release(self) -> None:
+        """Запрос завершился ошибкой, ничего не говорящей о здоровье хоста
+        (не тот content-type, отмена, локальная ошибка): пробный слот
+        освобождается, состояние размыкателя не меняется.
+        """
+        with self._lock:
+            self._probing = False
+
+
+class RetryPolicy:
+    """Единая политика повторов для SessionManager.get и downloader:
+    decorrelated jitter, бюджет времени на запрос и на главу, повтор только
+    для retryable-статусов/сетевых ошибок, размыкатель на хост.
+    """
+
+    def __init__(self, attempts: int = 4, base_delay: float = 1.0, max_delay: float = 8.0,
+                 timeout: float = 25.0, request_deadline: Optional[float] = 90.0,
+                 chapter_deadline: Optional[float] = None,
+                 retry_statuses: Iterable[int] = DEFAULT_RETRY_STATUSES,
+                 breaker_threshold: int = 5, breaker_cooldown: float = 30.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.request_deadline = request_deadline
+        self.chapter_deadline = chapter_deadline
+        self.retry_statuses = frozenset(retry_statuses)
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, app_cfg: Optional[Dict]) -> 'RetryPolicy':
+        app_cfg = app_cfg or {}
+        r = app_cfg.get('retry', {}) or {}
+        return cls(attempts=int(r.get('attempts', 4)),
+                   base_delay=float(r.get('base_delay', 1.0)),
+                   max_delay=float(r.get('max_delay', 8.0)),
+                   timeout=float(app_cfg.get('request_timeout', 25)),
+                   request_deadline=r.get('request_deadline', 90.0),
+                   chapter_deadline=r.get('chapter_deadline'),
+                   retry_statuses=r.get('retry_statuses', DEFAULT_RETRY_STATUSES),
+                   breaker_threshold=int(r.get('breaker_threshold', 5)),
+                   breaker_cooldown=float(r.get('breaker_cooldown', 30.0)))
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlparse(url).netloc
+        with self._lock:
+            b = self._breakers.get(host)
+            if b is None:
+                b = self._breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+            return b
+
+    def is_retryable(self, exc: Exception) -> bool:
+        if isinstance(exc, HttpStatusError):
+            return exc.status in self.retry_statuses
+        return isinstance(exc, TRANSIENT_ERRORS)
+
+    def next_delay(self, prev: float) -> float:
+        # decorrelated jitter: sleep = min(cap, U(base, prev * 3))
+        return min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, prev * 3)))
+
+    def call(self, url: str, fn: Callable[[float], T], deadline: Optional[Deadline] = None) -> T:
+        """Вызывает fn(timeout) с повторами. fn бросает исключение при неудаче
+        (HttpStatusError для плохого статуса). deadline — внешний бюджет
+        (например, на главу), поверх собственного бюджета запроса.
+        """
+        log = logging.getLogger('Retry')
+        br = self.breaker(url)
+        own = Deadline(self.request_deadline)
+        delay = self.base_delay
+        last_exc: Optional[Exception] = None
+        for i in range(1, self.attempts + 1):
+            left = _min_remaining(own, deadline)
+            if left is not None and left <= 0:
+                raise DeadlineExceeded(f"deadline exceeded for {url}") from last_exc
+            if not br.allow():
+                raise CircuitOpenError(f"circuit open for {urlparse(url).netloc}") from last_exc
+            timeout = self.timeout if left is None else max(0.1, min(self.timeout, left))
+            try:
+                result = fn(timeout)
+            except Exception as e:
+                last_exc = e
+                retryable = self.is_retryable(e)
+                if retryable:
+                    if br.failure():
+                        log.warning("CIRCUIT OPEN %s на %.0fs", urlparse(url).netloc, self.breaker_cooldown)
+                elif isinstance(e, HttpStatusError):
+                    # хост ответил (например, 404) — он жив
+                    br.success()
+                else:
+                    br.release()
+                if not retryable or i >= self.attempts:
+                    raise
+                delay = self.next_delay(delay)
+                if isinstance(e, HttpStatusError) and e.retry_after:
+                    delay = max(delay, e.retry_after)
+                left = _min_remaining(own, deadline)
+                if left is not None and delay >= left:
+                    raise DeadlineExceeded(f"deadline exceeded for {url}") from e
+                log.debug("RETRY %s через %.2fs (attempt %d): %s", url, delay, i, e)
+                with profiling.stage('retry_sleep'):
+                    time.sleep(delay)
+                continue
+            except BaseException:
+                br.release()
+                raise
+            br.success()
+            return result
+        raise last_exc or RuntimeError('Request failed without exception')
+
+
+def _min_remaining(*deadlines: Optional[Deadline]) -> Optional[float]:
+    vals = [r for r in (d.remaining() for d in deadlines if d is not None) if r is not None]
+    return min(vals) if vals else None
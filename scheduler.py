@@ -0,0 +1,170 @@
+# MangaToolkitV4 (c) 2025 S1riuSS3301
+# Licensed under end-user license agreement (EULA). See LICENSE for details.
+# Use permitted only in original, unmodified form for personal/internal, non-commercial purposes.
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Executor, Future
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import chapter_ids
+
+ORDERS = ('reading', 'latest')
+
+READABLE_FILE = '.readable'
+
+
+def chapter_priority(cid: Optional[str], order: str = 'reading', turn: int = 0) -> Tuple:
+    """Приоритет главы для PriorityExecutor (меньше — раньше).
+    turn — ход тайтла (TitleTurns): главы разных тайтлов в общем пуле идут
+    по кругу. Внутри хода: reading — по порядку чтения; latest — сначала
+    новые (для онгоингов).
+    """
+    major, minor = chapter_ids.sort_key(cid or '')
+    if order == 'latest':
+        return (turn, -major, tuple(-x for x in minor))
+    return (turn, major, minor)
+
+
+class TitleTurns:
+    """Ходы глав для очереди по кругу между тайтлами общего пула: очередная
+    глава тайтла получает следующий ход, и приоритет сравнивает сначала ходы,
+    а потом уже id глав. Иначе тайтл, докачивающий ранние главы (например,
+    только что добавленный в --watch), обгонял бы страницы остальных.
+    Новый или вернувшийся после простоя тайтл начинает с наименьшего хода
+    среди глав в работе, а не с нуля.
+    """
+
+    def __init__(self):
+        self._last: Dict[str, int] = {}
+        self._active: Counter = Counter()
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def take(self, title: str) -> int:
+        with self._lock:
+            floor = min(self._active) if self._active else self._floor
+            turn = max(self._last.get(title, -1) + 1, floor)
+            self._last[title] = turn
+            self._active[turn] += 1
+            return turn
+
+    def release(self, turn: int) -> None:
+        with self._lock:
+            self._active[turn] -= 1
+            if self._active[turn] <= 0:
+                del self._active[turn]
+            self._floor = max(self._floor, turn)
+
+
+class PriorityExecutor(Executor):
+    """Пул потоков с очередью по приоритету вместо FIFO: страницы ранних
+    глав (и ранние страницы внутри главы) уходят в работу первыми, даже если
+    задачи нескольких глав стоят в очереди одновременно.
+    submit() без приоритета ставит задачу вперёд всех приоритетных.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = 'dl'):
+        self._max_workers = max(1, max_workers)
+        self._prefix = thread_name_prefix
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: list = []
+        self._idle = 0
+        self._shutdown = False
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        return self.submit_prioritized((), fn, *args, **kwargs)
+
+    def submit_prioritized(self, priority: Tuple, fn, /, *args, **kwargs) -> Future:
+        f: Future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+            heapq.heappush(self._heap, (priority, next(self._seq), f, fn, args, kwargs))
+            # разбуженный, но ещё не взявший задачу поток числится простаивающим —
+            # сравниваем с длиной очереди, иначе пачка задач не растит пул
+            if len(self._heap) > self._idle and len(self._threads) < self._max_workers:
+                t = threading.Thread(target=self._worker, name=f"{self._prefix}_{len(self._threads)}", daemon=True)
+                self._threads.append(t)
+                t.start()
+            self._cond.notify()
+        return f
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                self._idle += 1
+                while not self._heap and not self._shutdown:
+                    self._cond.wait()
+                self._idle -= 1
+                if not self._heap:
+                    return
+                _, _, f, fn, args, kwargs = heapq.heappop(self._heap)
+            if not f.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                f.set_exception(e)
+            else:
+                f.set_result(result)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._cond:
+            self._shutdown = True
+            if cancel_futures:
+                for item in self._heap:
+                    item[2].cancel()
+                self._heap.clear()
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+
+class ReadableTracker:
+    """Отмечает главы, скачанные целиком (маркер .readable в каталоге главы —
+    её уже можно читать; в нём же URL главы для --repair), и меряет время от
+    старта прогона до первой такой главы.
+    """
+
+    def __init__(self):
+        self.t0 = time.monotonic()
+        self.count = 0
+        self.first: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def mark(self, out_dir: str, pages: int, url: Optional[str] = None) -> None:
+        path = os.path.join(out_dir, READABLE_FILE)
+        data = {'pages': pages, 'at': datetime.now().isoformat(timespec='seconds')}
+        if url:
+            data['url'] = url
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        dt = time.monotonic() - self.t0
+        with self._lock:
+            self.count += 1
+            first = self.first is None
+            if first:
+                self.first = dt
+        log = logging.getLogger('Scheduler')
+        log.info('READABLE %s', out_dir)
+        if first:
+            log.info('METRIC time_to_first_readable=%.2fs', dt)
+
+
+def read_marker(ch_dir: str) -> dict:
+    """Содержимое маркера .readable главы ({} если его нет или он битый)."""
+    try:
+        with open(os.path.join(ch_dir, READABLE_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
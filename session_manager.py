@@ -4,7 +4,11 @@
 import requests
 import yaml
 import os
-from typing import Dict
+from typing import Callable, Dict, Iterator, TypeVar
+
+from retry_policy import RetryPolicy, HttpStatusError, parse_retry_after
+
+T = TypeVar('T')
 
 
 class SessionManager:
@@ -29,28 +33,36 @@ class SessionManager:
             except Exception:
                 pass
         self.timeout = self.config.get('app', {}).get('request_timeout', 25)
-        self.retry = self.config.get('app', {}).get('retry', {"attempts": 3, "base_delay": 1.0, "max_delay": 8.0})
+        # единая политика повторов, общая с downloader (и размыкатели по хостам)
+        self.policy = RetryPolicy.from_config(self.config.get('app', {}))
 
     def get(self, url: str, referer: str | None = None) -> requests.Response:
-        import time
-        attempts = int(self.retry.get('attempts', 3))
-        delay = float(self.retry.get('base_delay', 1.0))
-        max_delay = float(self.retry.get('max_delay', 8.0))
-        last_exc = None
-        for i in range(1, attempts + 1):
-            try:
-                headers = {}
-                if referer:
-                    headers['Referer'] = referer
-                resp = self.session.get(url, headers=headers, timeout=self.timeout)
-                if resp.status_code == 200:
-                    return resp
-                last_exc = Exception(f"Bad status {resp.status_code}")
-            except Exception as e:
-                last_exc = e
-            if i < attempts:
-                time.sleep(delay)
-                delay = min(delay * 2, max_delay)
-        if last_exc:
-            raise last_exc
-        raise RuntimeError('Request failed without exception')
+        headers = {}
+        if referer:
+            headers['Referer'] = referer
+
+        def attempt(timeout: float) -> requests.Response:
+            resp = self.session.get(url, headers=headers, timeout=timeout)
+            if resp.status_code != 200:
+                raise HttpStatusError(resp.status_code, parse_retry_after(resp.headers.get('Retry-After')))
+            return resp
+
+        return self.policy.call(url, attempt)
+
+    def get_stream(self, url: str, consume: Callable[[Iterator[bytes]], T], chunk_size: int = 1 << 16,
+                   referer: str | None = None) -> T:
+        """GET с потоковым телом: consume получает итератор кусков по мере
+        прихода и возвращает результат. Повторы — как у get, но попытка
+        включает и чтение тела, так что consume может вызываться повторно.
+        """
+        headers = {}
+        if referer:
+            headers['Referer'] = referer
+
+        def attempt(timeout: float) -> T:
+            with self.session.get(url, headers=headers, timeout=timeout, stream=True) as resp:
+                if resp.status_code != 200:
+                    raise HttpStatusError(resp.status_code, parse_retry_after(resp.headers.get('Retry-After')))
+                return consume(resp.iter_content(chunk_size))
+
+        return self.policy.call(url, attempt)
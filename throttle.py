@@ -0,0 +1,136 @@
+# MangaToolkitV4 (c) 2025 S1riuSS3301
+# Licensed under end-user license agreement (EULA). See LICENSE for details.
+# Use permitted only in original, unmodified form for personal/internal, non-commercial purposes.
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+MB = 1024 * 1024
+
+
+def _parse_hhmm(s: str) -> int:
+    h, m = str(s).split(':', 1)
+    return int(h) * 60 + int(m)
+
+
+def parse_schedule(items: Optional[List[Dict]]) -> List[Tuple[int, int, float]]:
+    """[{from: '09:00', to: '19:00', limit_mb_s: 2}, ...] -> [(мин_с, мин_по, байт/с)].
+    Интервал может переходить через полночь (from > to).
+    """
+    out = []
+    for it in items or []:
+        out.append((_parse_hhmm(it['from']), _parse_hhmm(it['to']), float(it.get('limit_mb_s', 0)) * MB))
+    return out
+
+
+class BandwidthLimiter:
+    """Общий на процесс ограничитель скорости (байт/с) с честным делением
+    полосы между одновременно качающимися группами (главами/тайтлами):
+    каждая активная группа получает не больше rate / число_активных, поэтому
+    одна огромная лента не забивает канал остальным. Активная — передававшая
+    данные за последние ACTIVE_WINDOW секунд: зарегистрированная, но ждущая в
+    очереди пула группа долю не занимает. Заодно меряет текущую скорость для
+    строк прогресса.
+    """
+
+    ACTIVE_WINDOW = 2.0
+
+    def __init__(self, limit_bps: float = 0.0, schedule: Optional[List[Tuple[int, int, float]]] = None,
+                 burst_seconds: float = 0.5):
+        self.limit_bps = limit_bps
+        self.schedule = schedule or []
+        self.burst_seconds = burst_seconds
+        self._lock = threading.Lock()
+        self._groups: Dict[str, List[float]] = {}   # key -> [токены, refcount, последняя передача]
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        self._window: deque = deque()              # (t, bytes) за последние секунды
+        self._window_bytes = 0
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict]) -> 'BandwidthLimiter':
+        cfg = cfg or {}
+        return cls(limit_bps=float(cfg.get('limit_mb_s', 0) or 0) * MB,
+                   schedule=parse_schedule(cfg.get('schedule')))
+
+    def current_limit(self, now: Optional[datetime] = None) -> float:
+        """Лимит с учётом расписания; 0 — без ограничения."""
+        if self.schedule:
+            now = now or datetime.now()
+            m = now.hour * 60 + now.minute
+            for start, end, bps in self.schedule:
+                inside = start <= m < end if start <= end else (m >= start or m < end)
+                if inside:
+                    return bps
+        return self.limit_bps
+
+    def register(self, key: str) -> None:
+        with self._lock:
+            g = self._groups.setdefault(key, [0.0, 0, 0.0])
+            g[1] += 1
+
+    def unregister(self, key: str) -> None:
+        with self._lock:
+            g = self._groups.get(key)
+            if g is not None:
+                g[1] -= 1
+                if g[1] <= 0:
+                    del self._groups[key]
+
+    def _refill(self, now: float, rate: float) -> None:
+        dt = now - self._last
+        self._last = now
+        cap = rate * self.burst_seconds
+        self._tokens = min(cap, self._tokens + dt * rate)
+        active = [g for g in self._groups.values() if now - g[2] <= self.ACTIVE_WINDOW]
+        if active:
+            share = rate / len(active)
+            for g in active:
+                g[0] = min(share * self.burst_seconds, g[0] + dt * share)
+
+    def _active_count(self, now: float) -> int:
+        return sum(1 for g in self._groups.values() if now - g[2] <= self.ACTIVE_WINDOW)
+
+    def consume(self, key: str, n: int) -> None:
+        """Учитывает n байт группы key; блокирует, пока не позволит лимит."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                rate = self.current_limit()
+                if rate <= 0:
+                    self._last = now
+                    self._account(now, n)
+                    return
+                g = self._groups.get(key)
+                if g is not None:
+                    g[2] = now
+                self._refill(now, rate)
+                # токены могут уйти в минус: большой кусок просто «в долг»
+                if self._tokens >= 0 and (g is None or g[0] >= 0):
+                    self._tokens -= n
+                    if g is not None:
+                        g[0] -= n
+                    self._account(now, n)
+                    return
+                share = rate / max(1, self._active_count(now))
+                wait = max(-self._tokens / rate, (-g[0] / share) if g is not None and g[0] < 0 else 0.0)
+            time.sleep(min(max(wait, 0.001), 1.0))
+
+    def _account(self, now: float, n: int) -> None:
+        self._window.append((now, n))
+        self._window_bytes += n
+        while self._window and now - self._window[0][0] > 5.0:
+            self._window_bytes -= self._window.popleft()[1]
+
+    def rate_mb_s(self) -> float:
+        """Средняя скорость за последние ~5 секунд, МБ/с."""
+        with self._lock:
+            now = time.monotonic()
+            while self._window and now - self._window[0][0] > 5.0:
+                self._window_bytes -= self._window.popleft()[1]
+            if not self._window:
+                return 0.0
+            span = max(1.0, now - self._window[0][0])
+            return self._window_bytes / span / MB
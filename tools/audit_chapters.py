@@ -5,23 +5,20 @@ Licensed under end-user license agreement (EULA). See LICENSE for details.
 Use permitted only in original, unmodified form for personal/internal, non-commercial purposes.
 """
 import argparse
-import re
+import os
 import sys
 import urllib.request
 from bs4 import BeautifulSoup  # noqa: F401  # на будущее
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import chapter_ids  # noqa: E402
+
 DEFAULT_SITE = "https://mangapoisk.io"
 DEFAULT_SLUG = "wedding-ring-story-1"
 
-def parse_ids(html: str):
+def parse_ids(html: str, slug: str | None = None):
     # Ищем все /manga/<slug>/chapter/A-B(.C...)
-    ids = set()
-    for m in re.finditer(r"/manga/[\w\-]+/chapter/(\d+-[0-9][0-9\.]*)", html):
-        ids.add(m.group(1))
-    def key_fn(s: str):
-        a, b = s.split('-')
-        return (int(a), [int(x) for x in b.split('.')])
-    return sorted(ids, key=key_fn)
+    return chapter_ids.parse_ids(html, slug)[1]
 
 def main():
     ap = argparse.ArgumentParser(description="Аудит списка глав по slug")
@@ -38,18 +35,16 @@ def main():
     except Exception as e:
         print(f"[ERR] HTTP: {e}")
         return 2
-    ids = parse_ids(html)
+    ids = parse_ids(html, args.slug)
     print(f"URL: {url}")
     print(f"Всего глав на сайте: {len(ids)}")
     if ids:
         print(f"Диапазон: [{ids[0]} .. {ids[-1]}]")
-    # По томам (major=A)
-    majors = sorted({int(x.split('-')[0]) for x in ids})
-    print(f"Томов (major): {len(majors)}")
-    for M in majors:
-        minors = [x.split('-')[1] for x in ids if int(x.split('-')[0]) == M]
-        if minors:
-            print(f"Том {M:02d}: глав={len(minors)} диапазон=[{minors[0]} .. {minors[-1]}]")
+    # По томам (major=A), один проход по списку
+    groups = chapter_ids.group_by_major(ids)
+    print(f"Томов (major): {len(groups)}")
+    for M, minors in groups.items():
+        print(f"Том {M:02d}: глав={len(minors)} диапазон=[{minors[0]} .. {minors[-1]}]")
     return 0
 
 if __name__ == "__main__":
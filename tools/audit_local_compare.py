@@ -8,34 +8,17 @@ import re
 import sys
 import os
 import pathlib
-from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import chapter_ids  # noqa: E402
 
 # входные файлы/каталоги
 DEFAULT_HTML_FILE = "/home/sirius/Manga/manga_main_page.html"
 DOWNLOADS_DIR = "/home/sirius/Manga/MangaToolkitV4/Downloads"
 
-# slug берём из HTML ссылок
-SLUG_RE = re.compile(r"/manga/([\w\-]+)/chapter/(\d+-[0-9][0-9\.]*)")
-CH_ID_RE = re.compile(r"^(\d+)-([0-9][0-9\.]*)$")
 VOL_DIR_RE = re.compile(r"^Том\s+(\d+)$")
 
 
-def parse_online_ids(html: str):
-    ids = set()
-    slug_seen = None
-    for m in SLUG_RE.finditer(html):
-        slug, cid = m.group(1), m.group(2)
-        if slug_seen is None:
-            slug_seen = slug
-        if slug != slug_seen:
-            continue
-        ids.add(cid)
-    def key_fn(s: str):
-        a, b = s.split('-')
-        return (int(a), [int(x) for x in b.split('.')])
-    return slug_seen, sorted(ids, key=key_fn)
-
-
 def scan_local_ids(base: str, slug: str):
     result = []
     root = pathlib.Path(base) / slug
@@ -64,23 +47,18 @@ def scan_local_ids(base: str, slug: str):
                 except Exception:
                     continue
                 result.append(cid)
-    # сортировка
-    def key_fn(s: str):
-        a, b = s.split('-')
-        return (int(a), [int(x) for x in b.split('.')])
-    return sorted(set(result), key=key_fn)
+    return chapter_ids.sorted_ids(result)
 
 
 def main():
     # путь к HTML можно передать аргументом
     html_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_HTML_FILE
-    # читаем HTML
+    # сканируем HTML через mmap, не читая его целиком в str
     try:
-        html = pathlib.Path(html_file).read_text(encoding='utf-8', errors='ignore')
+        slug, online_ids = chapter_ids.scan_file(html_file)
     except Exception as e:
         print(f"[ERR] READ HTML: {e}")
         return 2
-    slug, online_ids = parse_online_ids(html)
     if not slug:
         print("[ERR] Не удалось определить slug из HTML")
         return 2
@@ -90,20 +68,8 @@ def main():
     local_ids = scan_local_ids(DOWNLOADS_DIR, slug)
 
     # индексация по томам
-    def group_by_major(ids):
-        g = defaultdict(list)
-        for cid in ids:
-            a, b = cid.split('-')
-            g[int(a)].append(b)
-        for k in g:
-            # сортировка b
-            def key_b(x):
-                return [int(t) for t in x.split('.')]
-            g[k] = sorted(g[k], key=key_b)
-        return dict(sorted(g.items()))
-
-    online_g = group_by_major(online_ids)
-    local_g = group_by_major(local_ids)
+    online_g = chapter_ids.group_by_major(online_ids)
+    local_g = chapter_ids.group_by_major(local_ids)
 
     # сводка
     print(f"Файл HTML: {html_file}")
@@ -116,8 +82,9 @@ def main():
     for M in majors:
         on = online_g.get(M, [])
         lo = local_g.get(M, [])
-        miss = [x for x in on if x not in lo]
-        extra = [x for x in lo if x not in on]
+        lo_set, on_set = set(lo), set(on)
+        miss = [x for x in on if x not in lo_set]
+        extra = [x for x in lo if x not in on_set]
         def rng(vals):
             return f"[{vals[0]} .. {vals[-1]}]" if vals else "[]"
         print(f"Том {M:02d}: online={len(on)} {rng(on)} | local={len(lo)} {rng(lo)} | missing={len(miss)} {miss[:10]}{' ...' if len(miss)>10 else ''}")
@@ -127,7 +94,8 @@ def main():
         on = online_g.get(M, [])
         lo = local_g.get(M, [])
         if on:
-            miss = [x for x in on if x not in lo]
+            lo_set = set(lo)
+            miss = [x for x in on if x not in lo_set]
             if miss:
                 print(f"ВНИМАНИЕ: Том {M:02d} пропущено локально {len(miss)} глав: {miss[:20]}{' ...' if len(miss)>20 else ''}")
             else:
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+MangaToolkitV4 (c) 2025 S1riuSS3301
+Licensed under end-user license agreement (EULA). See LICENSE for details.
+Use permitted only in original, unmodified form for personal/internal, non-commercial purposes.
+"""
+import argparse
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from downloader import download_images, page_filename  # noqa: E402
+
+
+def start_server(page_bytes: int):
+    """Локальный HTTP-сервер: любой путь отдаёт page_bytes байт как image/jpeg."""
+    body = os.urandom(page_bytes)
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *a):
+            pass
+
+    srv = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def baseline_download(session, items, out_dir, referer, concurrency):
+    """Прежний путь записи: iter_content по 16 КиБ, makedirs/exists/getsize на страницу."""
+    os.makedirs(out_dir, exist_ok=True)
+    total = len(items)
+
+    def _fetch(n, url):
+        path = os.path.join(out_dir, page_filename(n, total, url))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            return
+        r = session.get(url, headers={'Referer': referer}, timeout=25, stream=True)
+        with open(path, 'wb') as f:
+            for chunk in r.iter_content(chunk_size=1 << 14):
+                if chunk:
+                    f.write(chunk)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        for fut in as_completed([ex.submit(_fetch, n, u) for n, u in items]):
+            fut.result()
+
+
+def run(label, fn, rounds):
+    best = None
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Бенчмарк пути записи картинок (до/после) на локальном сервере")
+    ap.add_argument("--pages", type=int, default=200, help="Страниц за прогон")
+    ap.add_argument("--page-kb", type=int, default=1024, help="Размер страницы, КиБ")
+    ap.add_argument("--concurrency", type=int, default=6, help="Число потоков")
+    ap.add_argument("--chunk-kb", type=int, default=256, help="Буфер нового пути, КиБ")
+    ap.add_argument("--rounds", type=int, default=3, help="Повторов (берётся лучший)")
+    args = ap.parse_args()
+
+    srv = start_server(args.page_kb * 1024)
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    items = [(i, f"{base}/p/{i}.jpg") for i in range(1, args.pages + 1)]
+    tmp = tempfile.mkdtemp(prefix='bench-dl-')
+    session = requests.Session()
+    total_mb = args.pages * args.page_kb / 1024
+
+    def fresh(name):
+        d = os.path.join(tmp, name)
+        shutil.rmtree(d, ignore_errors=True)
+        return d
+
+    try:
+        t_old = run('before', lambda: baseline_download(session, items, fresh('old'), base, args.concurrency), args.rounds)
+        t_new = run('after', lambda: download_images(session, items, fresh('new'), base, concurrency=args.concurrency,
+                                                       chunk_size=args.chunk_kb * 1024, progress_interval=1e9), args.rounds)
+    finally:
+        srv.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"Страниц: {args.pages} x {args.page_kb} КиБ = {total_mb:.1f} МБ, потоков: {args.concurrency}")
+    print(f"before (iter_content 16 КиБ): {t_old:.3f}s  {total_mb / t_old:.1f} МБ/с")
+    print(f"after  (readinto {args.chunk_kb} КиБ): {t_new:.3f}s  {total_mb / t_new:.1f} МБ/с")
+    print(f"ускорение: x{t_old / t_new:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
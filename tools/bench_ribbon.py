@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+MangaToolkitV4 (c) 2025 S1riuSS3301
+Licensed under end-user license agreement (EULA). See LICENSE for details.
+Use permitted only in original, unmodified form for personal/internal, non-commercial purposes.
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from PIL import Image, ImageDraw
+
+try:
+    import resource
+except ImportError:  # Windows: пиковый RSS не меряется
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import ribbon_pdf  # noqa: E402
+
+# Сценарии: главы x страницы, размеры страниц, разброс ширины, форматы.
+SCENARIOS = {
+    'manga': dict(volumes=1, chapters=4, pages=20, width=900, height=(1300, 1300), width_jitter=0,
+                  formats=['jpg']),
+    'webtoon': dict(volumes=1, chapters=3, pages=12, width=720, height=(4000, 12000), width_jitter=40,
+                    formats=['jpg']),
+    'mixed': dict(volumes=2, chapters=2, pages=15, width=800, height=(1200, 6000), width_jitter=120,
+                  formats=['jpg', 'png', 'webp']),
+}
+
+_SAVE = {'jpg': ('JPEG', {'quality': 85}), 'png': ('PNG', {'optimize': False}), 'webp': ('WEBP', {'quality': 80})}
+
+
+def make_page(w: int, h: int, rnd: random.Random) -> Image.Image:
+    """Страница «как настоящая»: белые поля и промежутки, панели с заливкой и штрихами."""
+    im = Image.new('RGB', (w, h), 'white')
+    dr = ImageDraw.Draw(im)
+    y = rnd.randint(20, 200)
+    while y < h - 150:
+        ph = rnd.randint(300, 1400)
+        x0, x1 = rnd.randint(20, 60), w - rnd.randint(20, 60)
+        y1 = min(h - 20, y + ph)
+        dr.rectangle([x0, y, x1, y1], fill=tuple(rnd.randint(40, 230) for _ in range(3)), outline='black', width=3)
+        for _ in range(12):
+            dr.line([rnd.randint(x0, x1), rnd.randint(y, y1), rnd.randint(x0, x1), rnd.randint(y, y1)],
+                    fill='black', width=rnd.randint(1, 4))
+        y = y1 + rnd.randint(60, 300)
+    return im
+
+
+def generate(root: str, slug: str, sc: dict, scale: float, seed: int) -> dict:
+    """Downloads/<slug>/Том NN/Глава N/NNN.<ext> по сценарию; возвращает счётчики."""
+    rnd = random.Random(seed)
+    pages = bytes_total = 0
+    per_chapter = max(1, int(sc['pages'] * scale))
+    ch_num = 0
+    for v in range(1, sc['volumes'] + 1):
+        for _ in range(sc['chapters']):
+            ch_num += 1
+            d = os.path.join(root, slug, f"Том {v:02d}", f"Глава {ch_num}")
+            os.makedirs(d, exist_ok=True)
+            for n in range(1, per_chapter + 1):
+                w = sc['width'] + rnd.randint(-sc['width_jitter'], 0) if sc['width_jitter'] else sc['width']
+                h = rnd.randint(*sc['height'])
+                ext = rnd.choice(sc['formats'])
+                fmt, kw = _SAVE[ext]
+                path = os.path.join(d, f"{n:03d}.{ext}")
+                make_page(w, h, rnd).save(path, fmt, **kw)
+                pages += 1
+                bytes_total += os.path.getsize(path)
+    return {'pages': pages, 'source_mb': bytes_total / 1e6}
+
+
+def _proc_status_mb(field: str):
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak() -> None:
+    # Linux: ru_maxrss переживает exec, и ребёнок spawn наследует пик родителя —
+    # сбрасываем VmHWM, чтобы пик относился только к сборке
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _rss_mb(peak: bool = True):
+    v = _proc_status_mb('VmHWM' if peak else 'VmRSS')
+    if v is not None or resource is None:
+        return v
+    # ru_maxrss: КиБ на Linux, байты на macOS
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round((kb / 1024 if sys.platform != 'darwin' else kb / 1e6), 1)
+
+
+def run_build(slug_dir: str, max_height: int, quality: int, trim: bool) -> dict:
+    """Выполняется в отдельном процессе: пиковый RSS относится только к сборке."""
+    _reset_peak()
+    base_rss = _rss_mb(peak=False)
+    vols = ribbon_pdf.find_volume_dirs(slug_dir)
+    t0 = time.perf_counter()
+    c0 = time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for v in vols:
+            ribbon_pdf.process_volume(v, max_height, quality, True, trim)
+    wall = time.perf_counter() - t0
+    cpu = time.process_time() - c0
+    pdf_bytes = sum(os.path.getsize(os.path.join(v, 'volume.pdf')) for v in vols
+                    if os.path.exists(os.path.join(v, 'volume.pdf')))
+    return {'wall_s': wall, 'cpu_s': cpu, 'rss_base_mb': base_rss, 'rss_peak_mb': _rss_mb(), 'pdf_mb': pdf_bytes / 1e6}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Бенчмарк ribbon_pdf на синтетической библиотеке: страниц/с, МБ/с, CPU, пиковый RSS")
+    ap.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Сценарий (можно несколько; по умолчанию все)")
+    ap.add_argument("--scale", type=float, default=1.0, help="Множитель числа страниц в главе")
+    ap.add_argument("--max-height", type=int, default=25000, help="--max-height для ribbon_pdf")
+    ap.add_argument("--quality", type=int, default=90, help="--quality для ribbon_pdf")
+    ap.add_argument("--trim", action="store_true", help="Мерить режим --trim (нужен numpy)")
+    ap.add_argument("--rounds", type=int, default=1, help="Повторов сборки (берётся лучший по времени)")
+    ap.add_argument("--seed", type=int, default=1, help="Зерно генератора страниц")
+    ap.add_argument("--out", default="bench_ribbon.json", help="Куда записать JSON с результатами")
+    ap.add_argument("--keep", action="store_true", help="Не удалять сгенерированную библиотеку")
+    args = ap.parse_args()
+
+    if args.trim and ribbon_pdf.np is None:
+        print("[ERR] --trim требует numpy: pip install numpy")
+        return 2
+
+    tmp = tempfile.mkdtemp(prefix='bench-ribbon-')
+    results = []
+    try:
+        for name in args.scenario or sorted(SCENARIOS):
+            sc = SCENARIOS[name]
+            t = time.perf_counter()
+            info = generate(tmp, name, sc, args.scale, args.seed)
+            gen_s = time.perf_counter() - t
+            best = None
+            for _ in range(args.rounds):
+                # свежий процесс на прогон (spawn, а не fork — без памяти родителя
+                # после generate()): пиковый RSS сравним между сценариями
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as ex:
+                    r = ex.submit(run_build, os.path.join(tmp, name), args.max_height, args.quality, args.trim).result()
+                if best is None or r['wall_s'] < best['wall_s']:
+                    best = r
+            res = {
+                'scenario': name,
+                'pages': info['pages'],
+                'source_mb': round(info['source_mb'], 2),
+                'wall_s': round(best['wall_s'], 3),
+                'cpu_s': round(best['cpu_s'], 3),
+                'pages_per_s': round(info['pages'] / best['wall_s'], 2),
+                'mb_per_s': round(info['source_mb'] / best['wall_s'], 2),
+                'rss_base_mb': best['rss_base_mb'],
+                'rss_peak_mb': best['rss_peak_mb'],
+                'pdf_mb': round(best['pdf_mb'], 2),
+                'generate_s': round(gen_s, 2),
+            }
+            results.append(res)
+            print(f"{name:8s} страниц={res['pages']:4d} {res['source_mb']:7.1f} МБ  {res['wall_s']:7.2f}s "
+                  f"cpu={res['cpu_s']:6.2f}s  {res['pages_per_s']:6.1f} стр/с  {res['mb_per_s']:5.1f} МБ/с  "
+                  f"RSS={res['rss_peak_mb']} МБ  PDF={res['pdf_mb']} МБ")
+    finally:
+        if args.keep:
+            print(f"Библиотека сохранена: {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        'commit': git_commit(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pillow': Image.__version__,
+        'params': {'scale': args.scale, 'max_height': args.max_height, 'quality': args.quality,
+                   'trim': args.trim, 'rounds': args.rounds, 'seed': args.seed},
+        'results': results,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"Результаты: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,10 +7,19 @@ Use permitted only in original, unmodified form for personal/internal, non-comme
 import argparse
 import os
 import re
+import sys
 from typing import List, Tuple
 
 from PIL import Image
 
+try:
+    import numpy as np
+except ImportError:  # режим --trim без numpy недоступен
+    np = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import profiling  # noqa: E402
+
 
 def natural_key(s: str):
     # Разбиение строки на числа и текст для естественной сортировки
@@ -106,6 +115,121 @@ def build_ribbons(image_paths: List[str], max_ribbon_height: int) -> List[Image.
     return ribbons
 
 
+def analyze_page(path: str, tolerance: int, pad: int):
+    """Поля и пустые строки страницы (для --trim).
+
+    Страница переводится в оттенки серого и в массив numpy; фон — медиана
+    угловых пикселей (белые и чёрные поля одинаково). Строка/столбец пустые,
+    если их min и max укладываются в фон ± tolerance — это четыре редукции
+    по осям, без циклов по пикселям.
+    Возвращает (рамка обрезки (x0, y0, x1, y1), маска пустых строк внутри рамки)
+    или None, если страница целиком пустая.
+    """
+    with Image.open(path) as im:
+        gray = np.asarray(im.convert("L"))
+    h, w = gray.shape
+    bg = int(np.median([gray[0, 0], gray[0, -1], gray[-1, 0], gray[-1, -1]]))
+    lo, hi = bg - tolerance, bg + tolerance
+    rows = (gray.min(axis=1) >= lo) & (gray.max(axis=1) <= hi)
+    cols = (gray.min(axis=0) >= lo) & (gray.max(axis=0) <= hi)
+    content_rows = np.flatnonzero(~rows)
+    content_cols = np.flatnonzero(~cols)
+    if content_rows.size == 0 or content_cols.size == 0:
+        return None
+    x0 = max(0, int(content_cols[0]) - pad)
+    x1 = min(w, int(content_cols[-1]) + 1 + pad)
+    y0 = max(0, int(content_rows[0]) - pad)
+    y1 = min(h, int(content_rows[-1]) + 1 + pad)
+    return (x0, y0, x1, y1), rows[y0:y1]
+
+
+def plan_cuts(blank, page_starts, max_h: int) -> List[int]:
+    """Точки разреза общей «ленты» тома (в строках после обрезки).
+
+    Режем по середине ближайшей к max_h пустой полосы, но не раньше max_h/2,
+    чтобы не плодить короткие ленты; нет полосы — по последней границе
+    страниц (как без --trim); нет и её — жёстко по max_h.
+    """
+    total = len(blank)
+    min_h = max(1, max_h // 2)
+    cuts = [0]
+    pos = 0
+    while total - pos > max_h:
+        window = blank[pos + min_h:pos + max_h + 1]
+        idx = np.flatnonzero(window)
+        if idx.size:
+            last = int(idx[-1])
+            filled = np.flatnonzero(~window[:last])
+            first = int(filled[-1]) + 1 if filled.size else 0
+            cut = pos + min_h + (first + last) // 2
+        else:
+            i = int(np.searchsorted(page_starts, pos + max_h, side='right')) - 1
+            b = int(page_starts[i]) if i >= 0 else pos
+            cut = b if b - pos >= min_h else pos + max_h
+        cuts.append(cut)
+        pos = cut
+    cuts.append(total)
+    return cuts
+
+
+def build_ribbons_trimmed(image_paths: List[str], max_ribbon_height: int,
+                          tolerance: int = 10, pad: int = 8) -> List[Image.Image]:
+    """Как build_ribbons, но с обрезкой однотонных полей и разрезом лент по
+    пустым полосам (см. analyze_page, plan_cuts). Страница может разойтись
+    на две ленты, если подходящая пустая полоса — внутри неё.
+    """
+    pages = []      # (path, (x0, y0, x1, y1))
+    masks = []
+    src_px = 0
+    with profiling.stage('analyze'):
+        for p in image_paths:
+            info = analyze_page(p, tolerance, pad)
+            w, h = load_image_info(p)
+            src_px += w * h
+            if info is None:
+                continue
+            pages.append((p, info[0]))
+            masks.append(info[1])
+    if not pages:
+        return []
+    heights = np.array([len(m) for m in masks])
+    page_starts = np.concatenate(([0], np.cumsum(heights)[:-1]))
+    cuts = plan_cuts(np.concatenate(masks), page_starts, max_ribbon_height)
+
+    ribbons: List[Image.Image] = []
+    out_px = 0
+    cached = (None, None)   # страница на стыке лент открывается один раз
+    for a, b in zip(cuts, cuts[1:]):
+        first = int(np.searchsorted(page_starts, a, side='right')) - 1
+        last = int(np.searchsorted(page_starts, b, side='left')) - 1
+        parts = []
+        for i in range(first, last + 1):
+            path, (x0, y0, x1, y1) = pages[i]
+            top = y0 + max(0, a - int(page_starts[i]))
+            bottom = y0 + min(int(heights[i]), b - int(page_starts[i]))
+            if bottom > top:
+                parts.append((i, (x0, top, x1, bottom)))
+        width = max(box[2] - box[0] for _, box in parts)
+        canvas = Image.new("RGB", (width, b - a), (255, 255, 255))
+        y = 0
+        for i, box in parts:
+            if cached[0] != i:
+                if cached[1] is not None:
+                    cached[1].close()
+                cached = (i, open_image_rgb(pages[i][0]))
+            piece = cached[1].crop(box)
+            canvas.paste(piece, ((width - piece.width) // 2, y))
+            y += piece.height
+        out_px += canvas.width * canvas.height
+        ribbons.append(canvas)
+    if cached[1] is not None:
+        cached[1].close()
+    if src_px:
+        print(f"[TRIM] страниц: {len(image_paths)} (пустых: {len(image_paths) - len(pages)}), "
+              f"пикселей: {src_px / 1e6:.1f}M -> {out_px / 1e6:.1f}M ({100 * out_px / src_px:.0f}%), лент: {len(ribbons)}")
+    return ribbons
+
+
 def save_volume_pdf(volume_dir: str, ribbons: List[Image.Image], quality: int, force: bool) -> str:
     out_path = os.path.join(volume_dir, "volume.pdf")
     if os.path.exists(out_path) and not force:
@@ -126,20 +250,28 @@ def save_volume_pdf(volume_dir: str, ribbons: List[Image.Image], quality: int, f
     return out_path
 
 
-def process_volume(volume_dir: str, max_height: int, quality: int, force: bool) -> None:
+def process_volume(volume_dir: str, max_height: int, quality: int, force: bool,
+                   trim: bool = False, trim_tolerance: int = 10, trim_pad: int = 8) -> None:
     print(f"== Том: {volume_dir}")
-    chapters = find_chapter_dirs(volume_dir)
-    all_images: List[str] = []
-    for ch in chapters:
-        imgs = iter_images_in_chapter(ch)
-        if not imgs:
-            continue
-        all_images.extend(imgs)
+    with profiling.stage('scan'):
+        chapters = find_chapter_dirs(volume_dir)
+        all_images: List[str] = []
+        for ch in chapters:
+            imgs = iter_images_in_chapter(ch)
+            if not imgs:
+                continue
+            all_images.extend(imgs)
     if not all_images:
         print(f"[WARN] Нет картинок в томе: {volume_dir}")
         return
-    ribbons = build_ribbons(all_images, max_height)
-    save_volume_pdf(volume_dir, ribbons, quality, force)
+    with profiling.stage('compose'):
+        if trim:
+            ribbons = build_ribbons_trimmed(all_images, max_height, trim_tolerance, trim_pad)
+        else:
+            ribbons = build_ribbons(all_images, max_height)
+    with profiling.stage('save'):
+        save_volume_pdf(volume_dir, ribbons, quality, force)
+    profiling.mem_snapshot(os.path.basename(volume_dir))
 
 
 def main():
@@ -149,8 +281,21 @@ def main():
     ap.add_argument("--max-height", type=int, default=25000, help="Максимальная высота одной ленты (px)")
     ap.add_argument("--quality", type=int, default=90, help="Качество PDF сохранения")
     ap.add_argument("-f", "--force", action="store_true", help="Перезаписывать существующие volume.pdf")
+    ap.add_argument("--profile", action="store_true", help="Профилирование: cProfile, tracemalloc по томам и время по стадиям в logs/run-*.profile/")
+    ap.add_argument("--trim", action="store_true", help="Обрезать однотонные поля и резать ленты по пустым полосам (нужен numpy)")
+    ap.add_argument("--trim-tolerance", type=int, default=10, help="Допуск отличия от цвета фона для --trim (0-255)")
+    ap.add_argument("--trim-pad", type=int, default=8, help="Сколько px поля оставлять вокруг содержимого при --trim")
     args = ap.parse_args()
 
+    if args.trim and np is None:
+        print("[ERR] --trim требует numpy: pip install numpy")
+        return 2
+
+    if args.profile:
+        from logging_setup import setup_logging
+        log_path = setup_logging(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs'))
+        profiling.start(os.path.splitext(log_path)[0] + '.profile')
+
     base = os.path.abspath(args.base)
     slug_dir = os.path.join(base, args.slug)
     vols = find_volume_dirs(slug_dir)
@@ -158,7 +303,8 @@ def main():
         print(f"[ERR] Не найдены тома в {slug_dir}")
         return 2
     for v in vols:
-        process_volume(v, args.max_height, args.quality, args.force)
+        process_volume(v, args.max_height, args.quality, args.force,
+                       args.trim, args.trim_tolerance, args.trim_pad)
     return 0
 
 
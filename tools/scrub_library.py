@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+MangaToolkitV4 (c) 2025 S1riuSS3301
+Licensed under end-user license agreement (EULA). See LICENSE for details.
+Use permitted only in original, unmodified form for personal/internal, non-commercial purposes.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ribbon_pdf import find_volume_dirs, find_chapter_dirs, iter_images_in_chapter  # noqa: E402
+from scheduler import read_marker  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+_PNG_SIG = b'\x89PNG\r\n\x1a\n'
+_PNG_IEND = b'\x00\x00\x00\x00IEND\xaeB`\x82'
+
+
+def check_file(path: str, full: bool = False) -> Optional[str]:
+    """Проверка страницы: None — цела, иначе причина.
+    Быстрая — сигнатура в начале и признак конца файла (JPEG FFD9, PNG IEND,
+    размер RIFF у WebP): ловит обрезанные докачки и сохранённые вместо
+    картинки HTML-страницы. full — ещё и полное декодирование через PIL.
+    """
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return 'пустой файл'
+        with open(path, 'rb') as f:
+            head = f.read(16)
+            f.seek(max(0, size - 64))
+            tail = f.read()
+    except OSError as e:
+        return f'чтение: {e}'
+    if head[:3] == b'\xff\xd8\xff':
+        # хвостовые нули/переводы строк после EOI встречаются и безвредны
+        if not tail.rstrip(b'\x00\r\n ').endswith(b'\xff\xd9'):
+            return 'JPEG обрезан (нет маркера EOI)'
+    elif head[:8] == _PNG_SIG:
+        if not tail.endswith(_PNG_IEND):
+            return 'PNG обрезан (нет IEND)'
+    elif head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        need = int.from_bytes(head[4:8], 'little') + 8
+        if size < need:
+            return f'WebP обрезан ({size} из {need} байт)'
+    else:
+        return 'не изображение (неизвестная сигнатура)'
+    if full:
+        from PIL import Image
+        try:
+            with Image.open(path) as im:
+                im.load()
+        except Exception as e:
+            return f'декодирование: {e}'
+    return None
+
+
+def _check(args: Tuple[str, bool]) -> Optional[str]:
+    return check_file(*args)
+
+
+def iter_pages(base: str, slugs: List[str]):
+    """(slug, каталог тома, каталог главы, путь) — обход как в ribbon_pdf."""
+    for slug in slugs:
+        for v in find_volume_dirs(os.path.join(base, slug)):
+            for ch in find_chapter_dirs(v):
+                for p in iter_images_in_chapter(ch):
+                    yield slug, v, ch, p
+
+
+def load_cache(path: str) -> Dict[str, list]:
+    """Кэш проверок: путь относительно Downloads -> [size, mtime_ns, full, причина|None]."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path: str, cache: Dict[str, list]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Проверка целостности скачанных страниц с кэшем результатов; список битых — для cli.py --repair")
+    ap.add_argument("--slug", action="append", help="Слаг манги (можно несколько; по умолчанию все в Downloads)")
+    ap.add_argument("--base", default=os.path.join(ROOT, "Downloads"), help="Базовый каталог Downloads")
+    ap.add_argument("--full", action="store_true", help="Полное декодирование каждой страницы (медленнее)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Число процессов проверки")
+    ap.add_argument("--cache", default=os.path.join(ROOT, "state", "scrub_cache.json"), help="Файл кэша результатов")
+    ap.add_argument("--rescan", action="store_true", help="Игнорировать кэш и проверить всё заново")
+    ap.add_argument("--out", default="bad_pages.jsonl", help="Куда записать список битых страниц (JSONL)")
+    args = ap.parse_args()
+
+    base = os.path.abspath(args.base)
+    if not os.path.isdir(base):
+        print(f"[ERR] Нет каталога {base}")
+        return 2
+    slugs = args.slug or sorted(n for n in os.listdir(base) if os.path.isdir(os.path.join(base, n)))
+
+    old = {} if args.rescan else load_cache(args.cache)
+    # записи других тайтлов сохраняются как есть, записи проверяемых — только по живым файлам
+    prefixes = tuple(s + os.sep for s in slugs)
+    cache = {k: v for k, v in old.items() if not k.startswith(prefixes)}
+    pages = []
+    todo = []
+    t0 = time.perf_counter()
+    for slug, v, ch, p in iter_pages(base, slugs):
+        rel = os.path.relpath(p, base)
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        pages.append((slug, v, ch, p, rel))
+        c = old.get(rel)
+        # кэш годен, если файл не менялся и проверка была не слабее запрошенной
+        if c and c[0] == st.st_size and c[1] == st.st_mtime_ns and (c[2] or not args.full):
+            cache[rel] = c
+        else:
+            todo.append((rel, p, st))
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as ex:
+            results = ex.map(_check, [(p, args.full) for _, p, _ in todo], chunksize=16)
+            for (rel, _, st), reason in zip(todo, results):
+                cache[rel] = [st.st_size, st.st_mtime_ns, args.full, reason]
+    save_cache(args.cache, cache)
+
+    bad = []
+    for slug, v, ch, p, rel in pages:
+        reason = cache[rel][3]
+        if reason is None:
+            continue
+        name = os.path.basename(p)
+        try:
+            page = int(os.path.splitext(name)[0])
+        except ValueError:
+            page = None
+        rec = {'base': base, 'slug': slug, 'volume': os.path.basename(v), 'chapter': os.path.basename(ch),
+               'page': page, 'path': rel, 'reason': reason}
+        url = read_marker(ch).get('url')
+        if url:
+            rec['url'] = url
+        bad.append(rec)
+        print(f"[BAD] {rel}: {reason}")
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        for rec in bad:
+            f.write(json.dumps(rec, ensure_ascii=False) + '\n')
+    dt = time.perf_counter() - t0
+    print(f"Страниц: {len(pages)}, проверено: {len(todo)}, из кэша: {len(pages) - len(todo)}, "
+          f"битых: {len(bad)} за {dt:.1f}s")
+    if bad and os.path.realpath(base) == os.path.realpath(os.path.join(ROOT, "Downloads")):
+        print(f"Список битых: {args.out} — перекачать: python3 cli.py --repair {args.out}")
+    elif bad:
+        print(f"Список битых: {args.out} (cli.py --repair перекачивает только в Downloads репозитория)")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+# MangaToolkitV4 (c) 2025 S1riuSS3301
+# Licensed under end-user license agreement (EULA). See LICENSE for details.
+# Use permitted only in original, unmodified form for personal/internal, non-commercial purposes.
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+from urllib.parse import urlparse
+
+from chapter_ids import chapter_id_from_url
+
+
+def load_watchlist(path: str) -> List[str]:
+    """Читает список slug'ов: по одному в строке, '#' — комментарий.
+    Допускаются и полные URL тайтла — из них берётся slug.
+    """
+    slugs: List[str] = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            s = line.split('#', 1)[0].strip()
+            if not s:
+                continue
+            if '/manga/' in s:
+                parts = [x for x in urlparse(s).path.split('/') if x]
+                try:
+                    s = parts[parts.index('manga') + 1]
+                except Exception:
+                    continue
+            if s not in slugs:
+                slugs.append(s)
+    return slugs
+
+
+def load_state(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {'titles': {}}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except Exception as e:
+        logging.getLogger('Watcher').warning('Не удалось прочитать состояние %s: %s', path, e)
+        return {'titles': {}}
+    state.setdefault('titles', {})
+    return state
+
+
+def save_state(path: str, state: Dict) -> None:
+    # атомарная запись: сначала во временный файл, затем replace
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def next_poll_time(now: float, interval: float, jitter: float) -> float:
+    # равномерный разброс ±jitter, чтобы опросы тайтлов не шли пачкой
+    j = max(0.0, min(jitter, 0.9))
+    return now + interval * (1.0 + random.uniform(-j, j))
+
+
+def poll_title(slug: str, entry: Dict, list_chapters: Callable[[str], List[str]],
+               process_chapter: Callable[[str], int], save: Callable[[], None]) -> int:
+    """Один цикл для тайтла: один запрос списка глав + скачивание только новых.
+    Возвращает число успешно скачанных новых глав.
+    """
+    log = logging.getLogger('Watcher')
+    urls = list_chapters(slug)
+    known = set(entry.get('known', []))
+    fresh = [(cid, u) for cid, u in ((chapter_id_from_url(u), u) for u in urls) if cid and cid not in known]
+    log.info('WATCH %s: глав=%d, новых=%d', slug, len(urls), len(fresh))
+    done = 0
+    for cid, u in fresh:
+        st = process_chapter(u)
+        if st != 0:
+            # не помечаем как известную — повторим в следующем цикле
+            log.warning('WATCH %s: глава %s не скачана (код %s)', slug, cid, st)
+            continue
+        known.add(cid)
+        entry['known'] = sorted(known)
+        save()
+        done += 1
+    return done
+
+
+def run_watch(watchlist_path: str, state_path: str,
+              list_chapters: Callable[[str], List[str]],
+              process_chapter: Callable[[str], int],
+              interval: float = 3600.0, jitter: float = 0.2,
+              once: bool = False, parallel: int = 1) -> int:
+    """Демон наблюдения за тайтлами. Расписание и известные главы хранятся
+    в state_path и переживают перезапуск. parallel — сколько тайтлов
+    опрашивать и качать одновременно (полоса делится между ними поровну).
+    """
+    log = logging.getLogger('Watcher')
+    state = load_state(state_path)
+    titles: Dict[str, Dict] = state['titles']
+    lock = threading.Lock()
+
+    def _save():
+        with lock:
+            save_state(state_path, state)
+
+    def _poll(slug: str) -> None:
+        entry = titles[slug]
+        try:
+            poll_title(slug, entry, list_chapters, process_chapter, _save)
+        except Exception as e:
+            log.warning('WATCH %s: ошибка опроса: %s', slug, e)
+        t = time.time()
+        with lock:
+            entry['last_poll'] = t
+            entry['next_poll'] = next_poll_time(t, interval, jitter)
+        _save()
+
+    while True:
+        try:
+            slugs = load_watchlist(watchlist_path)
+        except Exception as e:
+            log.error('Не удалось прочитать watchlist %s: %s', watchlist_path, e)
+            return 2
+        now = time.time()
+        due = [s for s in slugs if titles.get(s, {}).get('next_poll', 0) <= now]
+        if due:
+            log.info('WATCH: к опросу %d из %d тайтлов', len(due), len(slugs))
+        with lock:
+            for slug in due:
+                titles.setdefault(slug, {'known': []})
+        if parallel > 1 and len(due) > 1:
+            with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix='watch') as ex:
+                list(ex.map(_poll, due))
+        else:
+            for slug in due:
+                _poll(slug)
+        if once:
+            return 0
+        pending = [titles[s]['next_poll'] for s in slugs if s in titles and 'next_poll' in titles[s]]
+        wake = min(pending) if pending else time.time() + interval
+        # просыпаемся не реже раза в минуту, чтобы подхватывать правки watchlist
+        time.sleep(min(max(1.0, wake - time.time()), 60.0))